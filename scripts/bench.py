@@ -0,0 +1,199 @@
+# bench.py
+# benchmarks: genera programas mini-lang de distintos tipos y mide cada etapa
+# (lexer, parser, semantica, codegen, vm) por separado. Los resultados salen en
+# json y se pueden comparar contra un baseline guardado antes (ej. en main)
+#
+#   python3 scripts/bench.py -o new.json
+#   python3 scripts/bench.py --baseline old.json --threshold 0.10
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from contextlib import redirect_stdout
+from typing import Callable, Dict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.lexer import Lexer
+from src.parser import Parser
+from src.semantics import SemanticAnalyzer
+from src.codegen import TACGenerator
+from src.vm import TACVM
+
+STAGES = ("lexer", "parser", "semantics", "codegen", "vm")
+# diferencias abajo de esto son ruido, no regresion
+NOISE_SECONDS = 0.002
+
+
+#  generadores de programas (scale agranda todos)
+
+def nested_loops(scale: int) -> str:
+    # 3 loops anidados: casi todo el tiempo se va en el vm
+    n = 30 * scale
+    return f"""int i; int j; int k; int s;
+s = 0;
+i = 0;
+while (i < {n}) {{
+    j = 0;
+    while (j < {n}) {{
+        k = 0;
+        while (k < {n}) {{
+            s = s + i * j - k;
+            k = k + 1;
+        }}
+        j = j + 1;
+    }}
+    i = i + 1;
+}}
+print(s);
+"""
+
+
+def straight_line(scale: int) -> str:
+    # muchas asignaciones aritmeticas seguidas (sin saltos)
+    lines = ["int a; int b; int c;", "a = 1; b = 2; c = 3;"]
+    for i in range(2000 * scale):
+        lines.append(f"a = (a * 31 + {i}) - (a * 31 + {i}) / 1000 * 1000;")
+        lines.append(f"b = b + a * {i % 7 + 1} - c / 3;")
+        lines.append(f"c = (b - a) / 2 + {i % 11};")
+    lines.append("print(a); print(b); print(c);")
+    return "\n".join(lines) + "\n"
+
+
+def declarations(scale: int) -> str:
+    # tabla de simbolos grande: muchas vars, cada una usada una vez
+    n = 5000 * scale
+    lines = [f"int v{i};" for i in range(n)]
+    lines += [f"v{i} = {i};" for i in range(n)]
+    lines.append(f"print(v{n - 1});")
+    return "\n".join(lines) + "\n"
+
+
+def nested_exprs(scale: int) -> str:
+    # exprs con muchos parentesis anidados (las pilas del parser/codegen)
+    depth = 40
+    lines = ["int x; bool ok;", "x = 0;"]
+    for i in range(100 * scale):
+        expr = "x"
+        for d in range(depth):
+            op = "+-*"[d % 3]
+            expr = f"({expr} {op} {d % 5 + 1})"
+        lines.append(f"x = {expr} / 1000;")
+        lines.append(f"ok = !(x < {i}) && (x != 3 || x == {i});")
+    lines.append("print(x); print(ok);")
+    return "\n".join(lines) + "\n"
+
+
+WORKLOADS: Dict[str, Callable[[int], str]] = {
+    "nested_loops": nested_loops,
+    "straight_line": straight_line,
+    "declarations": declarations,
+    "nested_exprs": nested_exprs,
+}
+
+
+def time_stages(source: str) -> Dict[str, float]:
+    # una pasada por todas las etapas, cada una cronometrada sola
+    times = {}
+    t = time.perf_counter()
+    tokens = Lexer(source).tokenize()
+    times["lexer"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    program = Parser.from_tokens(tokens).parse()
+    times["parser"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    SemanticAnalyzer().analyze(program)
+    times["semantics"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    tac = TACGenerator().generate(program)
+    times["codegen"] = time.perf_counter() - t
+
+    # el decode del tac cuenta como parte del vm
+    with open(os.devnull, "w") as null, redirect_stdout(null):
+        t = time.perf_counter()
+        TACVM(tac).run()
+        times["vm"] = time.perf_counter() - t
+    return times
+
+
+def run_benchmarks(names, scale: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name in names:
+        source = WORKLOADS[name](scale)
+        best: Dict[str, float] = {}
+        # el minimo de varias corridas es lo menos ruidoso
+        for _ in range(repeat):
+            for stage, secs in time_stages(source).items():
+                best[stage] = min(best.get(stage, secs), secs)
+        results[name] = best
+        print(f"{name:15s} " + "  ".join(f"{s} {best[s] * 1000:9.2f} ms" for s in STAGES))
+    return results
+
+
+def compare(results, baseline, threshold: float) -> int:
+    # regresa cuantas etapas quedaron mas lentas que baseline * (1 + threshold)
+    regressions = 0
+    print(f"\ncomparison against baseline (threshold {threshold:.0%}):")
+    for name, stages in results.items():
+        old_stages = baseline.get(name)
+        if old_stages is None:
+            print(f"{name:15s} (not in baseline)")
+            continue
+        for stage in STAGES:
+            new, old = stages.get(stage), old_stages.get(stage)
+            if new is None or old is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            slower = change > threshold and new - old > NOISE_SECONDS
+            mark = "REGRESSION" if slower else ""
+            regressions += slower
+            print(f"{name:15s} {stage:10s} {old * 1000:9.2f} -> {new * 1000:9.2f} ms "
+                  f"({change:+.1%}) {mark}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(usage="python bench.py [-o results.json] [--baseline old.json]")
+    ap.add_argument("workloads", nargs="*",
+                    help="que workloads correr (default: todos): " + ", ".join(WORKLOADS))
+    ap.add_argument("--scale", type=int, default=1, help="multiplica el tamano de los programas")
+    ap.add_argument("--repeat", type=int, default=3, help="corridas por workload (se toma el minimo)")
+    ap.add_argument("-o", dest="output", help="escribir los resultados en json")
+    ap.add_argument("--baseline", help="json de una corrida anterior pa comparar")
+    ap.add_argument("--threshold", type=float, default=0.10,
+                    help="cuanto mas lento (fraccion) cuenta como regresion")
+    args = ap.parse_args()
+
+    names = args.workloads or list(WORKLOADS)
+    for name in names:
+        if name not in WORKLOADS:
+            ap.error(f"unknown workload {name!r}")
+    results = run_benchmarks(names, args.scale, args.repeat)
+
+    if args.output:
+        data = {
+            "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                     "scale": args.scale, "repeat": args.repeat},
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("scale") != args.scale:
+            print("warning: baseline was run with a different --scale")
+        if compare(results, baseline["results"], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
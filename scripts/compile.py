@@ -1,52 +1,113 @@
 # nota: archivo para compilar a TAC
 
 import sys, os
+import argparse
 
 # path del proyecto (para que encuentre los modulos)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 
-from src.parser import Parser
-from src.semantics import SemanticAnalyzer, SemanticError
-from src.codegen import TACGenerator
+from src.semantics import SemanticError
+from src.pipeline import compile_to_tac, compile_stream, STREAM_MAX_OPT
+from src.tacbin import dump_lines
+from src.incremental import FragmentCache, DEFAULT_MAX_BYTES
+from src.srcmap import dump_map, map_path
 
 
 def main():
     # args basicos
-    if len(sys.argv) < 3:
-        print("Usage: python compile.py input.src -o output.tac")
-        sys.exit(1)
+    ap = argparse.ArgumentParser(usage="python compile.py input.src -o output.tac")
+    ap.add_argument("input")
+    ap.add_argument("-o", dest="output", required=True)
+    ap.add_argument("-O", dest="opt", type=int, default=0, choices=[0, 1, 2],
+                    help="nivel de optimizacion (1: doblar constantes y saltos directos en conds, "
+                         "2: ademas optimizar el tac)")
+    ap.add_argument("--unroll", type=int, default=1, metavar="N",
+                    help="desenrollar loops contados N veces (con -O2)")
+    ap.add_argument("--int64", choices=["wrap", "trap"],
+                    help="enteros de 64 bits al doblar constantes (usar lo mismo en run_tac.py)")
+    ap.add_argument("--reuse-temps", action="store_true",
+                    help="reciclar temporales muertos (linear scan)")
+    ap.add_argument("--binary", action="store_true",
+                    help="escribir el tac en formato binario (se carga con mmap)")
+    ap.add_argument("--stream", action="store_true",
+                    help="compilar stmt por stmt con memoria acotada (hasta -O1)")
+    ap.add_argument("--stats", action="store_true",
+                    help="imprimir estadisticas de cada etapa")
+    ap.add_argument("--cache", metavar="DIR",
+                    help="recompilar solo los stmts que cambiaron, guardando el tac en DIR")
+    ap.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                    metavar="MB", help="tamano maximo del cache en MB")
+    ap.add_argument("--map", action="store_true",
+                    help="escribir tambien OUTPUT.map: linea/col del src de cada instruc")
+    args = ap.parse_args()
 
-    input_file = sys.argv[1]
+    input_file = args.input
+    output_file = args.output
 
-    # checar flag de salida
-    if sys.argv[2] != "-o" or len(sys.argv) < 4:
-        print("Usage: python compile.py input.src -o output.tac")
+    if args.unroll != 1 and args.opt < 2:
+        print("--unroll needs -O2")
+        sys.exit(1)
+    if args.unroll < 1:
+        print("--unroll must be 1 or more")
         sys.exit(1)
+    if args.unroll != 1 and args.int64:
+        print("--unroll can't be used with --int64")
+        sys.exit(1)
+    int_mode = args.int64 or "big"
 
-    output_file = sys.argv[3]
+    # streaming: stmt por stmt directo al archivo de salida
+    if args.stream:
+        if args.opt > STREAM_MAX_OPT or args.reuse_temps or args.binary or args.cache or args.map:
+            print(f"--stream only supports -O{STREAM_MAX_OPT} or lower, "
+                  "without --reuse-temps, --binary, --cache or --map")
+            sys.exit(1)
+        with open(input_file, "r") as src, open(output_file, "w") as f:
+            try:
+                for instr in compile_stream(src, args.opt, int_mode):
+                    f.write(instr + "\n")
+            except SemanticError as e:
+                print(f"Semantic error: {e}")   # msg directo
+                sys.exit(1)
+        return
 
     # leer archivo src
     with open(input_file, "r") as f:
         source = f.read()
 
-    # parser (ast)
-    parser = Parser(source)
-    program = parser.parse()
+    if args.cache and args.map:
+        print("--map can't be used with --cache")
+        sys.exit(1)
 
-    # semantica
-    sem = SemanticAnalyzer()
+    cache = None
+    if args.cache:
+        cache = FragmentCache(args.cache, args.cache_size * 1024 * 1024)
+
+    spans = [] if args.map else None
+
+    # parser, semantica, optimizaciones y codegen
     try:
-        sem.analyze(program)
+        tac = compile_to_tac(source, args.opt, args.reuse_temps,
+                             report=print if args.stats else None, cache=cache,
+                             source_map=spans, unroll=args.unroll, int_mode=int_mode)
     except SemanticError as e:
         print(f"Semantic error: {e}")   # msg directo
         sys.exit(1)
 
-    # generar tac
-    gen = TACGenerator()
-    tac = gen.generate(program)
+    if args.map:
+        dump_map(spans, map_path(output_file), input_file)
+    elif os.path.exists(map_path(output_file)):
+        os.remove(map_path(output_file))   # el de una compilacion anterior ya no cuadra
 
     # guardar salida
+    if args.binary:
+        try:
+            dump_lines(tac, output_file)
+        except ValueError as e:
+            print(f"Binary output error: {e}")
+            sys.exit(1)
+        return
+
     with open(output_file, "w") as f:
         for instr in tac:
             f.write(instr + "\n")
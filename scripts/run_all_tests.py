@@ -1,20 +1,103 @@
 # script para correr todos los tests (rapido)
 
 import os
+import sys
 import subprocess
+import tempfile
 
 # root del proyecto
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.api import compile_source
+
+try:
+    import numpy   # solo pa el vm por lotes
+except ImportError:
+    numpy = None
+
 SRC_DIR = os.path.join(ROOT, "tests")
+TMP_DIR = tempfile.mkdtemp(prefix="minilang-tests-")
+CACHE_DIR = os.path.join(TMP_DIR, "cache")
+
+# cada grupo: (nombre, flags de compile.py, flags de run_tac.py); la salida de
+# cada config debe ser la misma que la de la primera del grupo (-O0). El cache
+# va dos veces: la primera llena el cache y la segunda lo reusa
+CONFIGS = [
+    [("-O0", "", ""),
+     ("-O1", "-O1", ""),
+     ("-O2", "-O2", ""),
+     ("--unroll", "-O2 --unroll 4", ""),
+     ("--cache", f"-O1 --cache {CACHE_DIR}", ""),
+     ("--cache (hit)", f"-O1 --cache {CACHE_DIR}", ""),
+     ("--no-fuse", "", "--no-fuse"),
+     ("--backend py", "-O2", "--backend py"),
+     ("--binary", "-O2 --binary", "")],
+    [("--int64 trap -O0", "--int64 trap", "--int64 trap"),
+     ("--int64 trap -O2", "-O2 --int64 trap", "--int64 trap")],
+]
+
+# limites conocidos: (config, error al compilar) que no cuentan como diferencia
+NOT_SUPPORTED = [
+    ("--binary", "does not fit in 64 bits"),   # el pool de constantes es de i64
+]
+
+# inputs pa el vm por lotes (si no, una corrida sin inputs). Se compara carril por
+# carril contra el vm normal con --int64 wrap, que es lo que hace BatchVM
+BATCH_INPUTS = {
+    "batch1_wide_values.src": [{}, {"n": 2 ** 63 + 5}, {"n": -(2 ** 64) - 3}],
+}
+
+# el texto del error cambia entre backends (el vm dice la instruc, el de python
+# no): se compara solo que clase de error fue
+ERRORS = {
+    "used before assignment": "var sin valor",
+    "Division by zero": "division entre 0",
+    "Integer overflow": "overflow",
+}
 
 def run(cmd):
     # nota: ejecutar comando y regresar stdout/stderr
     result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
     return result.stdout.strip(), result.stderr.strip(), result.returncode
 
+def error_kind(stderr):
+    last = stderr.splitlines()[-1] if stderr else ""
+    for text, kind in ERRORS.items():
+        if text in last:
+            return kind
+    return last
+
+def outcome(src_path, tac, compile_flags, run_flags):
+    # (salida, error) de compilar y correr con esas flags
+    stdout, stderr, code = run(f"python3 scripts/compile.py {src_path} -o {tac} {compile_flags}")
+    if code != 0:
+        return None, "compile: " + error_kind(stderr or stdout)
+    stdout, stderr, code = run(f"python3 scripts/run_tac.py {tac} {run_flags}")
+    return stdout, error_kind(stderr) if code != 0 else None
+
+def not_supported(name, got):
+    return got[0] is None and any(name == config and text in got[1]
+                                  for config, text in NOT_SUPPORTED)
+
+def batch_mismatches(fname, source):
+    # (inputs, esperado, salio) de los carriles del BatchVM que no dan lo mismo
+    # que el vm normal en modo wrap
+    prog = compile_source(source, opt_level=2, cache=False, int_mode="wrap")
+    inputs_list = BATCH_INPUTS.get(fname, [{}])
+
+    def lane(result):
+        return result.values, result.error and error_kind(result.error)
+
+    expected = [lane(r) for r in prog.run_many(inputs_list, processes=False)]
+    got = [lane(r) for r in prog.run_batch(inputs_list)]
+    return [(inputs, e, g) for inputs, e, g in zip(inputs_list, expected, got) if e != g]
+
 print("\n=== Running All Tests ===")
 print("-------------------------\n")
 
+failures = []   # (test, config) que no dieron lo mismo que -O0
+
 # recorrer todos los src
 for fname in sorted(os.listdir(SRC_DIR)):
     if not fname.endswith(".src"):
@@ -43,6 +126,38 @@ for fname in sorted(os.listdir(SRC_DIR)):
         print(stdout)
     if stderr:
         print(stderr)
+
+    # las demas configs contra -O0
+    for group in CONFIGS:
+        tac = os.path.join(TMP_DIR, fname.replace(".src", ".tac"))
+        expected = None
+        for name, compile_flags, run_flags in group:
+            got = outcome(src_path, tac, compile_flags, run_flags)
+            if expected is None:
+                expected = got
+            elif not_supported(name, got):
+                print(f"[SKIP {name}] {got[1]}")
+            elif got != expected:
+                failures.append((fname, name))
+                print(f"[MISMATCH {name}]")
+                print(f"  expected: {expected}")
+                print(f"  got:      {got}")
+
+    # vm por lotes (numpy es opcional)
+    if numpy is not None:
+        with open(src_path) as f:
+            source = f.read()
+        for inputs, expected, got in batch_mismatches(fname, source):
+            failures.append((fname, "batch"))
+            print(f"[MISMATCH batch {inputs}]")
+            print(f"  expected: {expected}")
+            print(f"  got:      {got}")
     print()
 
 print("=== DONE ===")
+if failures:
+    print(f"{len(failures)} mismatches:")
+    for fname, name in failures:
+        print(f"  {fname}: {name}")
+    sys.exit(1)
+print("all configs match -O0")
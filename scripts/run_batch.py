@@ -0,0 +1,141 @@
+# run_batch.py
+# compila y corre muchos .src en paralelo (pool de procesos), todo en proceso:
+# sin lanzar python3 dos veces por archivo como run_all_tests.py
+# cada archivo tiene timeout y su salida se captura; al final va un resumen
+
+import os
+import sys
+import time
+import signal
+import argparse
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.semantics import SemanticError
+from src.pipeline import compile_to_tac
+from src.vm import TACVM
+from src.pygen import PyVM
+
+BACKENDS = {"vm": TACVM, "py": PyVM}
+MAX_OUTPUT = 64 * 1024   # lo que se guarda de la salida de cada programa
+
+STATUSES = ("ok", "compile error", "runtime error", "timeout", "crash")
+
+
+@dataclass
+class Result:
+    name: str
+    status: str       # uno de STATUSES
+    output: str       # lo que imprimio el programa (cortado a MAX_OUTPUT)
+    error: str        # msg del error, "" si ok
+    seconds: float
+
+
+class Timeout(Exception):
+    pass
+
+
+class Capture:
+    # como StringIO pero deja de guardar despues de MAX_OUTPUT
+    # (un loop infinito con print no se come la memoria del worker)
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, s: str) -> int:
+        if self.size < MAX_OUTPUT:
+            self.parts.append(s)
+            self.size += len(s)
+        return len(s)
+
+    def flush(self):
+        pass
+
+    def getvalue(self) -> str:
+        return "".join(self.parts)[:MAX_OUTPUT]
+
+
+def _alarm(signum, frame):
+    raise Timeout()
+
+
+def run_one(path: str, opt_level: int, backend: str, timeout: float) -> Result:
+    # corre en el worker: compilar + ejecutar un archivo
+    name = os.path.basename(path)
+    out = Capture()
+    start = time.perf_counter()
+    # SIGALRM solo existe en unix; sin el no hay timeout
+    use_alarm = timeout > 0 and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with open(path, "r") as f:
+            source = f.read()
+        try:
+            tac = compile_to_tac(source, opt_level)
+        except (SyntaxError, SemanticError) as e:
+            return Result(name, "compile error", "", str(e), time.perf_counter() - start)
+        with redirect_stdout(out):
+            BACKENDS[backend](tac).run()
+        status, error = "ok", ""
+    except Timeout:
+        status, error = "timeout", f"timed out after {timeout:g}s"
+    except RuntimeError as e:
+        status, error = "runtime error", str(e)
+    except Exception as e:   # bug del compilador/vm: se reporta, no tumba el batch
+        status, error = "crash", f"{type(e).__name__}: {e}"
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return Result(name, status, out.getvalue(), error, time.perf_counter() - start)
+
+
+def main():
+    ap = argparse.ArgumentParser(usage="python run_batch.py [dir] [-j N] [--timeout S]")
+    ap.add_argument("directory", nargs="?", default=os.path.join(ROOT, "tests"))
+    ap.add_argument("-j", dest="jobs", type=int, default=os.cpu_count() or 1,
+                    help="procesos en el pool")
+    ap.add_argument("--timeout", type=float, default=10.0,
+                    help="segundos maximos por archivo (0: sin limite)")
+    ap.add_argument("-O", dest="opt", type=int, default=0, choices=[0, 1, 2],
+                    help="nivel de optimizacion (igual que compile.py)")
+    ap.add_argument("--backend", choices=sorted(BACKENDS), default="vm")
+    ap.add_argument("--show-output", action="store_true",
+                    help="imprimir la salida de cada programa")
+    args = ap.parse_args()
+
+    paths = sorted(os.path.join(args.directory, f)
+                   for f in os.listdir(args.directory) if f.endswith(".src"))
+    start = time.perf_counter()
+    n = len(paths)
+    # chunks pa no pagar un viaje al pool por cada programa chiquito
+    chunk = max(1, n // (args.jobs * 8))
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        results = list(pool.map(run_one, paths, [args.opt] * n, [args.backend] * n,
+                                [args.timeout] * n, chunksize=chunk))
+    elapsed = time.perf_counter() - start
+
+    counts = dict.fromkeys(STATUSES, 0)
+    for r in results:
+        counts[r.status] += 1
+        line = f"{r.name}: {r.status} ({r.seconds * 1000:.1f} ms)"
+        if r.error:
+            line += f" - {r.error}"
+        print(line)
+        if args.show_output and r.output:
+            print(r.output, end="" if r.output.endswith("\n") else "\n")
+
+    summary = ", ".join(f"{c} {s}" for s, c in counts.items() if c)
+    print(f"\n{n} programs in {elapsed:.2f}s with {args.jobs} workers: {summary or 'nothing to run'}")
+    # los errores de compilacion/ejecucion pueden ser esperados (tests de error);
+    # timeouts y crashes no
+    sys.exit(1 if counts["timeout"] or counts["crash"] else 0)
+
+
+if __name__ == "__main__":
+    main()
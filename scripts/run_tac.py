@@ -2,28 +2,90 @@
 
 import os
 import sys
+import argparse
 
 # ruta base del proyecto (para importar el modulo vm)
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, ROOT)
 
 from src.vm import TACVM
+from src.pygen import PyVM
+from src.tacbin import is_binary, load
+from src.profiler import ProfilingVM
+from src.srcmap import load_map, map_path
+
+# backends disponibles: el VM interpretado o el tac traducido a python
+BACKENDS = {"vm": TACVM, "py": PyVM}
+
 
 def main():
     # args minimos
-    if len(sys.argv) < 2:
-        print("Usage: python run_tac.py program.tac")
-        sys.exit(1)
+    ap = argparse.ArgumentParser(usage="python run_tac.py program.tac")
+    ap.add_argument("tac_file")
+    ap.add_argument("--backend", choices=sorted(BACKENDS), default="vm",
+                    help="vm: interprete de tac, py: tac compilado a python")
+    ap.add_argument("--no-fuse", action="store_true",
+                    help="no juntar instrucs en superinstrucciones (solo vm)")
+    ap.add_argument("--int64", choices=["wrap", "trap"],
+                    help="enteros de 64 bits en array('q'): al desbordarse dan la vuelta "
+                         "o truenan (solo vm)")
+    ap.add_argument("--profile", action="store_true",
+                    help="contar y cronometrar cada instruc (solo vm); el reporte sale en stderr")
+    ap.add_argument("--profile-top", type=int, default=10, metavar="N",
+                    help="cuantas entradas por seccion del reporte")
+    args = ap.parse_args()
+
+    tac_file = args.tac_file
+
+    # leer instrucciones tac (el binario se carga ya decodificado)
+    if is_binary(tac_file):
+        instructions = load(tac_file)
+    else:
+        with open(tac_file, "r") as f:
+            instructions = [line.rstrip("\n") for line in f]
+
+    if args.profile and args.backend != "vm":
+        ap.error("--profile only works with --backend vm")
+    if args.no_fuse and args.backend != "vm":
+        ap.error("--no-fuse only works with --backend vm")
+    if args.int64 and args.backend != "vm":
+        ap.error("--int64 only works with --backend vm")
+    int_mode = args.int64 or "big"
+    if args.profile:
+        vm = ProfilingVM(instructions, int_mode=int_mode)
+    elif args.backend == "vm":
+        vm = TACVM(instructions, fused=not args.no_fuse, int_mode=int_mode)
+    else:
+        vm = BACKENDS[args.backend](instructions)
+
+    # mapa al src (lo escribe compile.py --map), si hay y es de este tac
+    spans = None
+    if os.path.exists(map_path(tac_file)):
+        spans = load_map(map_path(tac_file))
+        if isinstance(vm, TACVM) and len(spans) != len(vm.program.code):
+            spans = None
+
+    if not args.profile:
+        run(vm, spans)
+        return
+    try:
+        run(vm, spans)
+    finally:
+        # aun si el programa truena, lo que alcanzo a correr sirve
+        source_lines = [s.line if s else None for s in spans] if spans else None
+        print(vm.profile.report(args.profile_top, source_lines), file=sys.stderr)
 
-    tac_file = sys.argv[1]
 
-    # leer instrucciones tac
-    with open(tac_file, "r") as f:
-        instructions = [line.rstrip("\n") for line in f]
+def run(vm, spans):
+    # con mapa, los errores de runtime dicen de que parte del src vienen
+    try:
+        vm.run()
+    except RuntimeError as e:
+        pc = getattr(vm, "pc", 0) - 1   # el vm deja pc despues de la instruc que trono
+        if spans and 0 <= pc < len(spans) and spans[pc]:
+            raise RuntimeError(f"{e} (source {spans[pc].line}:{spans[pc].col})") from None
+        raise
 
-    # vm: ejecuta el tac linea por linea
-    vm = TACVM(instructions)
-    vm.run()
 
 if __name__ == "__main__":
     main()   # ejecutar tac
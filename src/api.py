@@ -0,0 +1,168 @@
+# api.py
+# api pa usar el compilador desde python sin pasar por archivos:
+#
+#   prog = compile_source("int x; print(x + 1);")
+#   prog.run({"x": 41}).values   # [42]
+#
+# el programa decodificado se queda en memoria, y los compilados se guardan en
+# un LRU por hash del src (el mismo src no se vuelve a parsear)
+
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from src.pipeline import compile_to_tac
+from src.vm import TACVM, TACProgram, decode
+from src.sinks import ListSink
+from src.batchvm import BatchVM
+
+CACHE_SIZE = 128   # programas compilados que se guardan
+
+
+@dataclass
+class RunResult:
+    values: List[int]             # lo que imprimio
+    error: Optional[str] = None   # msg del RuntimeError si trono
+
+
+def _start(program: TACProgram, inputs: Optional[Dict[str, int]], output,
+           int_mode: str = "big") -> TACVM:
+    # vm nuevo sobre el programa compartido, con las vars iniciales ya puestas
+    vm = TACVM(program, output, int_mode=int_mode)
+    for name, value in (inputs or {}).items():
+        if name not in vm.slots:
+            raise ValueError(f"Unknown variable '{name}'")
+        vm.regs[vm.slots[name]] = int(value)
+    return vm
+
+
+def _run_once(program: TACProgram, inputs: Optional[Dict[str, int]],
+              int_mode: str = "big") -> RunResult:
+    output = ListSink()
+    try:
+        _start(program, inputs, output, int_mode).run()
+    except RuntimeError as e:
+        return RunResult(output.values, str(e))
+    return RunResult(output.values)
+
+
+# en el pool de procesos cada worker decodifica el tac una vez (las funciones
+# de BINOPS no se pueden mandar por pickle) y lo reusa en todas sus corridas
+_worker_program: Optional[TACProgram] = None
+_worker_int_mode = "big"
+
+
+def _init_worker(tac: List[str], int_mode: str):
+    global _worker_program, _worker_int_mode
+    _worker_program = decode(tac)
+    _worker_int_mode = int_mode
+
+
+def _run_in_worker(inputs: Optional[Dict[str, int]]) -> RunResult:
+    return _run_once(_worker_program, inputs, _worker_int_mode)
+
+
+@dataclass
+class CompiledProgram:
+    tac: List[str]         # el tac como texto
+    program: TACProgram    # ya decodificado, listo pa el vm
+    opt_level: int
+    int_mode: str = "big"  # con el que se doblaron las constantes y con el que corre
+
+    def run(self, inputs: Optional[Dict[str, int]] = None, output=None):
+        # inputs: valores iniciales de vars declaradas (bools como 0/1)
+        # output: sink de los print; si no se da se juntan en un ListSink.
+        # regresa el sink usado
+        if output is None:
+            output = ListSink()
+        _start(self.program, inputs, output, self.int_mode).run()
+        return output
+
+    def run_many(self, inputs_list: Iterable[Optional[Dict[str, int]]],
+                 workers: Optional[int] = None, processes: bool = True) -> List[RunResult]:
+        # una corrida por cada dict de inputs (ej. un barrido de parametros), en
+        # un pool de procesos (o de hilos: comparten el programa pero no el GIL).
+        # un RuntimeError queda en RunResult.error y no para las demas corridas
+        inputs_list = list(inputs_list)
+        if processes:
+            chunk = max(1, len(inputs_list) // ((workers or 4) * 8))
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(self.tac, self.int_mode)) as pool:
+                return list(pool.map(_run_in_worker, inputs_list, chunksize=chunk))
+        with ThreadPoolExecutor(workers) as pool:
+            return list(pool.map(lambda inputs: _run_once(self.program, inputs, self.int_mode),
+                                 inputs_list))
+
+    def run_batch(self, inputs_list: Iterable[Optional[Dict[str, int]]]) -> List[RunResult]:
+        # como run_many pero todas las corridas van juntas en un BatchVM (numpy,
+        # valores int64). Una var que falta en un dict queda sin valor en esa corrida
+        if self.int_mode == "trap":
+            raise ValueError("run_batch wraps on overflow, it can't run int_mode 'trap'")
+        inputs_list = [inputs or {} for inputs in inputs_list]
+        vm = BatchVM(self.program, len(inputs_list))
+        for name in sorted({name for inputs in inputs_list for name in inputs}):
+            lanes = [i for i, inputs in enumerate(inputs_list) if name in inputs]
+            vm.set(name, [int(inputs_list[i][name]) for i in lanes], lanes)
+        vm.run()
+        return [RunResult(values, error) for values, error in zip(vm.outputs(), vm.errors)]
+
+
+class _LRU:
+    def __init__(self, size: int):
+        self.size = size
+        self.entries: "OrderedDict[str, CompiledProgram]" = OrderedDict()
+        self.lock = threading.Lock()   # el servicio puede compilar desde varios hilos
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CompiledProgram]:
+        with self.lock:
+            prog = self.entries.get(key)
+            if prog is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return prog
+
+    def put(self, key: str, prog: CompiledProgram):
+        with self.lock:
+            self.entries[key] = prog
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+
+_cache = _LRU(CACHE_SIZE)
+
+
+def compile_source(source: str, opt_level: int = 0, cache: bool = True,
+                   int_mode: str = "big") -> CompiledProgram:
+    # SyntaxError / SemanticError se dejan pasar igual que en compile_to_tac
+    # int_mode: "big", "wrap" o "trap" (ver vm.int_ops), pa compilar y pa correr
+    key = f"{opt_level}:{int_mode}:" + hashlib.sha256(source.encode()).hexdigest()
+    if cache:
+        prog = _cache.get(key)
+        if prog is not None:
+            return prog
+    tac = compile_to_tac(source, opt_level, int_mode=int_mode)
+    prog = CompiledProgram(tac, decode(tac), opt_level, int_mode)
+    if cache:
+        _cache.put(key, prog)
+    return prog
+
+
+def cache_info() -> Dict[str, int]:
+    return {"hits": _cache.hits, "misses": _cache.misses,
+            "size": len(_cache.entries), "max_size": _cache.size}
+
+
+def clear_cache():
+    _cache.clear()
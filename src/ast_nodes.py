@@ -1,37 +1,84 @@
 # ast_nodes.py
 # nodos del astt arbol sintactico este modulo nada mas define
 # las clases que usa el parser/semantica/codegen
+# todos llevan __slots__ (sin __dict__ por nodo) pa que un ast grande pese poco
 
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List, NamedTuple, Optional
+
+# tipos como tags chiquitos en vez de un string por nodo
+TYPE_UNKNOWN = 0
+TYPE_INT = 1
+TYPE_BOOL = 2
+TYPE_NAMES = (None, "int", "bool")
+TYPE_TAGS = {None: TYPE_UNKNOWN, "int": TYPE_INT, "bool": TYPE_BOOL}
+
+
+class Span(NamedTuple):
+    # rango en el src, lineas/cols desde 1 y el final inclusivo
+    line: int
+    col: int
+    end_line: int
+    end_col: int
+
+
+class Node:
+    # pos/last: offset en el src del primer y del ultimo token del nodo (los pone
+    # el parser). Solo offsets (los mismos ints de los tokens): line/col se sacan
+    # en span() con el LineIndex del lexer, y los tokens no se quedan vivos
+    __slots__ = ("pos", "last")
+
+    def at(self, pos: int, last: int) -> "Node":
+        self.pos = pos
+        self.last = last
+        return self
+
+    def copy_span(self, other: "Node") -> "Node":
+        # pa nodos que arma un pase (ej. folding): heredan el rango del original
+        if not hasattr(self, "pos") and hasattr(other, "pos"):
+            self.pos, self.last = other.pos, other.last
+        return self
+
+    def span(self, index) -> Optional[Span]:
+        # index: el LineIndex del texto que se parseo
+        try:
+            pos, last = self.pos, self.last
+        except AttributeError:
+            return None   # nodo armado a mano, sin posicion
+        return Span(*index.line_col(pos), *index.line_col(index.token_end(last) - 1))
+
 
 #  Program-level
 
 @dataclass
 class Program:
+    __slots__ = ("statements",)
     statements: List["Stmt"]   # lista de stmts del programa orden normal
 
 
-#  Statements stmts 
+#  Statements stmts
 
-class Stmt:
-    pass   # solo es clase base, no hace nada
+class Stmt(Node):
+    __slots__ = ()   # solo es clase base, no hace nada
 
 
 @dataclass
 class VarDecl(Stmt):
+    __slots__ = ("var_type", "name")
     var_type: str   # int o bool
     name: str       # nombre de la var
 
 
 @dataclass
 class Assign(Stmt):
+    __slots__ = ("name", "expr")
     name: str       # var destino
     expr: "Expr"    # expr a evaluar
 
 
 @dataclass
 class IfStmt(Stmt):
+    __slots__ = ("cond", "then_block", "else_block")
     cond: "Expr"        # condicion booleana
     then_block: "Block" # bloque si true
     else_block: Optional["Block"]  # else puede ser None
@@ -39,43 +86,63 @@ class IfStmt(Stmt):
 
 @dataclass
 class WhileStmt(Stmt):
+    __slots__ = ("cond", "body")
     cond: "Expr"     # condicion del loop
     body: "Block"    # stmts del cuerpo
 
 
 @dataclass
 class PrintStmt(Stmt):
+    __slots__ = ("expr",)
     expr: "Expr"     # expr a imprimir
 
 
 @dataclass
 class Block(Stmt):
+    __slots__ = ("statements",)
     statements: List[Stmt]   # un bloque solo es una lista de stmts
 
 
-#  Expressions (exprs) 
+#  Expressions (exprs)
+
+class Expr(Node):
+    __slots__ = ("ty",)   # TYPE_*; la semantica lo llena
+
+    @property
+    def inferred_type(self) -> Optional[str]:
+        # int o bool como string; None si la semantica no ha pasado
+        try:
+            return TYPE_NAMES[self.ty]
+        except AttributeError:
+            return None
 
-class Expr:
-    inferred_type: Optional[str] = None  # int o bool la semantica lo llena
+    @inferred_type.setter
+    def inferred_type(self, name: Optional[str]):
+        self.ty = TYPE_TAGS[name]
 
 
 @dataclass
 class IntLiteral(Expr):
+    __slots__ = ("value",)
     value: int   # literal entero
 
 
 @dataclass
 class BoolLiteral(Expr):
+    __slots__ = ("value",)
     value: bool  # literal bool
 
 
 @dataclass
 class VarRef(Expr):
+    # assigned: la semantica lo pone en True si la var seguro ya tiene valor ahi
+    __slots__ = ("name", "assigned")
     name: str   # referencia a var
 
 
 @dataclass
 class BinaryOp(Expr):
+    __slots__ = ("op", "left", "right")
     op: str      # '+', '-', '*', '/', '<', && etc
     left: Expr
     right: Expr  # expr derecha
@@ -83,5 +150,31 @@ class BinaryOp(Expr):
 
 @dataclass
 class UnaryOp(Expr):
+    __slots__ = ("op", "expr")
     op: str      # '!' o similar
     expr: Expr
+
+
+def can_fault(expr: Expr, overflow: bool = False) -> bool:
+    # si evaluar expr puede tronar en runtime: una var que a lo mejor no tiene
+    # valor, o una division entre algo que no es constante != 0 (overflow: la
+    # aritmetica tambien, con int64 "trap"). Un pase que quita o se salta un
+    # subarbol solo lo puede hacer si no truena
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, VarRef):
+            if not getattr(node, "assigned", False):
+                return True
+        elif isinstance(node, BinaryOp):
+            if node.op == "/" and not (isinstance(node.right, IntLiteral) and node.right.value != 0):
+                return True
+            if overflow and node.op in ("+", "-", "*", "/"):
+                return True
+            stack.append(node.left)
+            stack.append(node.right)
+        elif isinstance(node, UnaryOp):
+            if overflow and node.op == "-":
+                return True
+            stack.append(node.expr)
+    return False
@@ -0,0 +1,250 @@
+# batchvm.py
+# vm por lotes: corre un mismo programa sobre muchos juegos de valores iniciales
+# a la vez. Cada registro es un arreglo de numpy con un carril por corrida y
+# cada instruc es una op de numpy sobre los carriles que van en ese pc, asi el
+# costo del interprete se paga una vez por instruc y no una vez por corrida.
+#
+# cuando un if manda carriles a lados distintos el lote se parte en grupos
+# (pc -> mascara de carriles). Siempre corre el grupo de pc mas bajo y un grupo
+# se estaciona si se pasa del pc de otro: los que salen de un loop esperan en
+# la salida a los que siguen dando vueltas, y los dos lados de un if se vuelven
+# a juntar en el label del final.
+#
+# diferencias con TACVM: los valores son int64 (al desbordarse dan la vuelta)
+# y un error (var sin valor, division entre 0) solo para a su carril; lo que
+# ese carril imprimio antes se queda. numpy es opcional, solo lo pide este vm
+
+from typing import Dict, List, Optional, Sequence, Union
+from src.vm import TACProgram, Op, BINOPS, _div, decode, wrap64
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ALL = slice(None)   # el grupo trae todos los carriles: ops sobre el renglon completo
+
+
+def _vdiv(a, b):
+    # igual que _div (trunca hacia cero); b ya viene sin ceros
+    q = a // b
+    return q + ((q < 0) & (q * b != a))
+
+
+def _vector_ops() -> Dict:
+    # funcion escalar de BINOPS -> su version sobre arreglos (los relacionales dan 0/1)
+    def rel(f):
+        return lambda a, b: f(a, b).astype(np.int64)
+
+    return {
+        BINOPS["+"]: np.add,
+        BINOPS["-"]: np.subtract,
+        BINOPS["*"]: np.multiply,
+        BINOPS["/"]: _vdiv,
+        BINOPS["<"]: rel(np.less),
+        BINOPS["<="]: rel(np.less_equal),
+        BINOPS[">"]: rel(np.greater),
+        BINOPS[">="]: rel(np.greater_equal),
+        BINOPS["=="]: rel(np.equal),
+        BINOPS["!="]: rel(np.not_equal),
+        BINOPS["&&"]: lambda a, b: ((a != 0) & (b != 0)).astype(np.int64),
+        BINOPS["||"]: lambda a, b: ((a != 0) | (b != 0)).astype(np.int64),
+    }
+
+
+VBINOPS = _vector_ops() if np is not None else {}
+
+
+class BatchVM:
+    def __init__(self, instructions: Union[List[str], TACProgram], size: int,
+                 inputs: Optional[Dict[str, Sequence[int]]] = None, fused: bool = True):
+        # size: cuantos carriles (corridas); inputs: var -> un valor por carril
+        # (o uno solo pa todos). Pa darle valor solo a algunos carriles ver set()
+        if np is None:
+            raise ImportError("BatchVM needs numpy (pip install numpy)")
+        if isinstance(instructions, TACProgram):
+            self.program = instructions
+        else:
+            self.program = decode(instructions)
+        self.size = size
+        self.fused = fused
+        program = self.program
+        nvars = len(program.names)
+        self.regs = np.zeros((program.nslots, size), dtype=np.int64)
+        # constantes e inputs fuera de int64 dan la vuelta, igual que en --int64 wrap
+        consts = [wrap64(c) for c in program.consts]
+        self.regs[nvars:] = np.array(consts, dtype=np.int64).reshape(-1, 1)
+        # assigned: que carriles ya tienen valor en cada slot. known[slot] dice
+        # que todos lo tienen, y entonces ni se checa
+        self.assigned = np.zeros((program.nslots, size), dtype=bool)
+        self.assigned[nvars:] = True
+        self.known = [False] * nvars + [True] * len(program.consts)
+        self.errors: List[Optional[str]] = [None] * size   # msg del error de cada carril
+        self._prints: list = []   # (carriles o None si todos, valores), en orden
+        for name, values in (inputs or {}).items():
+            self.set(name, values)
+
+    def set(self, name: str, values, lanes=ALL):
+        # valores iniciales de una var en los carriles dados (indices)
+        if name not in self.program.slots:
+            raise ValueError(f"Unknown variable '{name}'")
+        slot = self.program.slots[name]
+        if np.ndim(values) == 0:
+            values = wrap64(int(values))
+        else:
+            values = [wrap64(int(v)) for v in values]
+        self.regs[slot][lanes] = np.asarray(values, dtype=np.int64)
+        self.assigned[slot][lanes] = True
+        self.known[slot] = bool(self.assigned[slot].all())
+
+    def outputs(self) -> List[List[int]]:
+        # lo que imprimio cada carril
+        out: List[List[int]] = [[] for _ in range(self.size)]
+        for lanes, values in self._prints:
+            for lane, value in zip(range(self.size) if lanes is None else lanes.tolist(),
+                                   values.tolist()):
+                out[lane].append(value)
+        return out
+
+    def run(self):
+        code = self.program.fused if self.fused else self.program.code
+        # pc -> carriles estacionados ahi
+        groups: Dict[int, "np.ndarray"] = {}
+        if self.size:
+            groups[0] = np.ones(self.size, dtype=bool)
+        with np.errstate(over="ignore"):
+            while groups:
+                pc = min(groups)
+                self._run_group(code, pc, groups.pop(pc), groups)
+
+    def _fail(self, lanes, msg: str, mask):
+        for lane in lanes.tolist():
+            self.errors[lane] = msg
+        mask[lanes] = False
+
+    def _run_group(self, code, pc: int, mask, groups: Dict[int, "np.ndarray"]):
+        # corre los carriles de mask desde pc hasta que se acaban, se parten
+        # o alcanzan a un grupo que va atras
+        n = len(code)
+        regs, assigned, known = self.regs, self.assigned, self.known
+        program = self.program
+        lowest = min(groups) if groups else n
+
+        def select():
+            return ALL if mask.all() else np.flatnonzero(mask)
+
+        def unset(slot: int, need=None):
+            # indices de los carriles del grupo sin valor en slot (need: solo esos)
+            if known[slot]:
+                return None
+            ok = assigned[slot][lanes]
+            if need is not None:
+                ok = ok | ~need
+            if ok.all():
+                if lanes is ALL and need is None:
+                    known[slot] = True
+                return None
+            return np.flatnonzero(mask)[~ok]
+
+        def mark(dst: int):
+            # los carriles del grupo ya tienen valor en dst
+            if not known[dst]:
+                assigned[dst][lanes] = True
+                if lanes is ALL:
+                    known[dst] = True
+
+        def write(dst: int, values):
+            regs[dst][lanes] = values
+            mark(dst)
+
+        def park(at: int, lanes_mask):
+            if at in groups:
+                groups[at] |= lanes_mask
+            else:
+                groups[at] = lanes_mask
+
+        lanes = select()
+        while pc < n:
+            if pc >= lowest:
+                if pc > lowest:
+                    park(pc, mask)
+                    return
+                mask |= groups.pop(pc)
+                lanes = select()
+                lowest = min(groups) if groups else n
+
+            op, dst, a, fn, b, target, _ = code[pc]
+            if op == Op.GOTO:
+                pc = target
+                continue
+
+            # carriles que leen algo sin valor (copiar incluido, igual que en
+            # TACVM): truenan ahi y el resto repite la instruc
+            missing = a
+            bad = unset(a)
+            if bad is None and fn is not None:
+                need = None
+                if fn is BINOPS["&&"]:
+                    need = regs[a][lanes] != 0   # con a en 0 ni se ve b
+                elif fn is BINOPS["||"]:
+                    need = regs[a][lanes] == 0
+                missing = b
+                bad = unset(b, need)
+            if bad is not None:
+                self._fail(bad, f"Variable '{program.names[missing]}' used before assignment "
+                                f"in: {program.instr_text(pc)}", mask)
+            elif fn is _div:
+                zero = regs[b][lanes] == 0
+                if zero.any():
+                    bad = np.flatnonzero(mask)[zero]
+                    self._fail(bad, f"Division by zero in: {program.instr_text(pc)}", mask)
+            if bad is not None:
+                if not mask.any():
+                    return
+                lanes = select()
+                continue
+
+            if op == Op.COPY:
+                write(dst, regs[a][lanes])
+                pc += 1
+                continue
+            if op == Op.BINOP or op == Op.SET:
+                write(dst, VBINOPS[fn](regs[a][lanes], regs[b][lanes]))
+                pc = pc + 1 if op == Op.BINOP else target
+                continue
+            if op == Op.INC:
+                write(dst, regs[a][lanes] + regs[b][lanes])
+                pc = target
+                continue
+            if op == Op.NOT:
+                write(dst, (regs[a][lanes] == 0).astype(np.int64))
+                pc = target
+                continue
+            if op == Op.PRINT:
+                values = regs[a][lanes] if fn is None else VBINOPS[fn](regs[a][lanes], regs[b][lanes])
+                self._prints.append((None if lanes is ALL else lanes, values.copy()))
+                pc += 1
+                continue
+
+            # saltos condicionales: taken = carriles que van a jump, los demas a pc + 1
+            jump, other = target, pc + 1
+            if op == Op.IF:
+                taken = regs[a][lanes] != 0
+            elif op == Op.IFOP:
+                taken = VBINOPS[fn](regs[a][lanes], regs[b][lanes]) != 0
+            else:
+                # CMPJ: salta a target si da 0, si no sigue en dst
+                taken = VBINOPS[fn](regs[a][lanes], regs[b][lanes]) == 0
+                other = dst
+            if taken.all():
+                pc = jump
+            elif not taken.any():
+                pc = other
+            else:
+                # se parte el grupo; el scheduler sigue con el de pc mas bajo
+                jumped = np.zeros(self.size, dtype=bool)
+                jumped[np.flatnonzero(mask)[taken]] = True
+                park(jump, jumped)
+                park(other, mask & ~jumped)
+                return
+        # los carriles que llegan al final ya terminaron
@@ -2,15 +2,28 @@
 # modulo que genera tac aqui se arman las instrucs finales
 # esto lo usa el VM para correr el programa
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from src.ast_nodes import *
 
 
+# op relacional -> su negacion (pa saltar cuando la cond es falsa)
+NEGATED = {"<": ">=", "<=": ">", ">": "<=", ">=": "<", "==": "!=", "!=": "=="}
+
+
 class TACGenerator:
-    def __init__(self):
+    def __init__(self, short_circuit: bool = False, overflow: bool = False):
+        # short_circuit: las conds de if/while saltan directo (if a < b goto L)
+        # y && / || se vuelven cadenas de saltos en vez de materializar 0/1
+        # overflow: la aritmetica puede tronar (int64 "trap"), no se la salta
+        self.short_circuit = short_circuit
+        self.overflow = overflow
         self.temp_count = 0      # temps para exprs
         self.label_count = 0     # labels pa saltos
         self.instructions: List[str] = []
+        # tabla aparte (no va en el texto): nodo del ast que saco cada linea de
+        # instructions, pa mapear el tac al src; None si no hay
+        self.origins: List[Optional[Node]] = []
+        self.origin: Optional[Node] = None   # stmt que se esta generando
         self.var_storage: Dict[str, str] = {}  # var  nombre en la VM
 
     def new_temp(self) -> str:
@@ -23,9 +36,10 @@ class TACGenerator:
         self.label_count += 1
         return f"L{self.label_count}"
 
-    def emit(self, instr: str):
-        # mete una instruccion tac4 a la lista
+    def emit(self, instr: str, origin: Optional[Node] = None):
+        # mete una instruccion tac4 a la lista; origin: expr que la saco (si no, el stmt)
         self.instructions.append(instr)
+        self.origins.append(origin or self.origin)
 
     def generate(self, program: Program) -> List[str]:
         # asignar storage para cada var aqui solo el mismo nombre
@@ -39,10 +53,25 @@ class TACGenerator:
             self.gen_stmt(stmt)
         return self.instructions
 
+    def generate_stmt(self, stmt: Stmt) -> List[str]:
+        # modo streaming: tac de un solo stmt top-level; las instrucs no se acumulan
+        self.gen_stmt(stmt)
+        out = self.instructions
+        self.instructions = []
+        self.origins = []
+        return out
+
     def gen_stmt(self, stmt: Stmt):
+        outer = self.origin
+        self.origin = stmt
+        self._gen_stmt(stmt)
+        self.origin = outer
+
+    def _gen_stmt(self, stmt: Stmt):
         if isinstance(stmt, VarDecl):
-            # declaracion sola no tira Tac
-            pass
+            # declaracion sola no tira Tac, solo aparta storage
+            if stmt.name not in self.var_storage:
+                self.var_storage[stmt.name] = stmt.name
 
         elif isinstance(stmt, Assign):
             src = self.gen_expr(stmt.expr)
@@ -54,6 +83,29 @@ class TACGenerator:
             val = self.gen_expr(stmt.expr)
             self.emit(f"print {val}")
 
+        elif isinstance(stmt, IfStmt) and self.short_circuit:
+            else_label = self.new_label() if stmt.else_block else None
+            end_label = self.new_label()
+
+            self.gen_branch(stmt.cond, else_label or end_label, False)
+            self.gen_block(stmt.then_block)
+            if stmt.else_block:
+                self.emit(f"goto {end_label}")
+                self.emit(f"{else_label}:")
+                self.gen_block(stmt.else_block)
+            self.emit(f"{end_label}:")
+
+        elif isinstance(stmt, WhileStmt) and self.short_circuit:
+            # cond al final del loop: una sola instruc de salto por vuelta
+            body_label = self.new_label()
+            test_label = self.new_label()
+
+            self.emit(f"goto {test_label}")
+            self.emit(f"{body_label}:")
+            self.gen_block(stmt.body)
+            self.emit(f"{test_label}:")
+            self.gen_branch(stmt.cond, body_label, True)
+
         elif isinstance(stmt, IfStmt):
             cond_val = self.gen_expr(stmt.cond)
             then_label = self.new_label()
@@ -62,7 +114,7 @@ class TACGenerator:
 
             # if saltos simples
             if stmt.else_block:
-                self.emit(f"if {cond_val} == 0 goto {else_label}")
+                self.emit(f"if {cond_val} == 0 goto {else_label}", stmt.cond)
                 self.emit(f"{then_label}:")
                 self.gen_block(stmt.then_block)
                 self.emit(f"goto {end_label}")
@@ -70,7 +122,7 @@ class TACGenerator:
                 self.gen_block(stmt.else_block)
                 self.emit(f"{end_label}:")
             else:
-                self.emit(f"if {cond_val} == 0 goto {end_label}")
+                self.emit(f"if {cond_val} == 0 goto {end_label}", stmt.cond)
                 self.gen_block(stmt.then_block)
                 self.emit(f"{end_label}:")
 
@@ -80,7 +132,7 @@ class TACGenerator:
 
             self.emit(f"{start_label}:")
             cond_val = self.gen_expr(stmt.cond)
-            self.emit(f"if {cond_val} == 0 goto {end_label}")
+            self.emit(f"if {cond_val} == 0 goto {end_label}", stmt.cond)
             self.gen_block(stmt.body)
             self.emit(f"goto {start_label}")
             self.emit(f"{end_label}:")
@@ -94,57 +146,119 @@ class TACGenerator:
         for s in block.statements:
             self.gen_stmt(s)
 
+    def gen_branch(self, expr: Expr, label: str, when: bool):
+        # salta a label si expr vale `when`, si no sigue derecho
+        # pila de tareas en vez de recursion (cadenas largas de && / ||):
+        # ("branch", expr, label, when) o ("label", nombre, ...) pa emitir un label
+        tasks = [("branch", expr, label, when)]
+        while tasks:
+            task, expr, label, when = tasks.pop()
+            if task == "label":
+                self.emit(f"{expr}:")
+                continue
+
+            if isinstance(expr, BoolLiteral):
+                if expr.value == when:
+                    self.emit(f"goto {label}", expr)
+                continue
+
+            if isinstance(expr, UnaryOp) and expr.op == "!":
+                tasks.append(("branch", expr.expr, label, not when))
+                continue
+
+            if isinstance(expr, BinaryOp) and expr.op in NEGATED:
+                left = self.gen_expr(expr.left)
+                right = self.gen_expr(expr.right)
+                op = expr.op if when else NEGATED[expr.op]
+                self.emit(f"if {left} {op} {right} goto {label}", expr)
+                continue
+
+            if isinstance(expr, BinaryOp) and expr.op in ("&&", "||") and not can_fault(expr.right, self.overflow):
+                # (se apilan al reves: el lado izq va primero). Si el lado der
+                # puede tronar no se lo salta: se evalua entero como en -O0
+                if (expr.op == "&&") != when:
+                    # && falso o || verdadero: basta con que un lado lo sea
+                    tasks.append(("branch", expr.right, label, when))
+                    tasks.append(("branch", expr.left, label, when))
+                else:
+                    # el lado izq decide sin ver el derecho
+                    skip = self.new_label()
+                    tasks.append(("label", skip, None, None))
+                    tasks.append(("branch", expr.right, label, when))
+                    tasks.append(("branch", expr.left, skip, not when))
+                continue
+
+            val = self.gen_expr(expr)
+            self.emit(f"if {val} {'!=' if when else '=='} 0 goto {label}", expr)
+
     def gen_expr(self, expr: Expr) -> str:
-        # literales
-        if isinstance(expr, IntLiteral):
-            return str(expr.value)
-
-        if isinstance(expr, BoolLiteral):
-            return "1" if expr.value else "0"
-
-        if isinstance(expr, VarRef):
-            return self.var_storage[expr.name]
-
-        # unary ops (! , -)
-        if isinstance(expr, UnaryOp):
-            v = self.gen_expr(expr.expr)
-            tmp = self.new_temp()
-
-            if expr.op == "-":
-                self.emit(f"{tmp} := 0 - {v}")
-            elif expr.op == "!":
-                # negacion bool simple
-                t1 = self.new_temp()
-                self.emit(f"{t1} := {v} != 0")
-                self.emit(f"{tmp} := 1 - {t1}")
+        # postorden con pila explicita: cadenas de BinaryOp de miles de terminos
+        # no llegan al limite de recursion. Mismo orden que antes (izq, der, nodo)
+        # asi que los temps salen con los mismos numeros
+        stack = [(expr, False)]
+        values: List[str] = []   # operandos tac de los subarboles ya generados
+        while stack:
+            node, children_done = stack.pop()
+            if isinstance(node, BinaryOp):
+                if not children_done:
+                    stack.append((node, True))
+                    stack.append((node.right, False))
+                    stack.append((node.left, False))
+                    continue
+                right = values.pop()
+                left = values.pop()
+                values.append(self._gen_binary(node, left, right))
+            elif isinstance(node, UnaryOp):
+                if not children_done:
+                    stack.append((node, True))
+                    stack.append((node.expr, False))
+                    continue
+                values.append(self._gen_unary(node, values.pop()))
+            elif isinstance(node, IntLiteral):
+                values.append(str(node.value))
+            elif isinstance(node, BoolLiteral):
+                values.append("1" if node.value else "0")
+            elif isinstance(node, VarRef):
+                values.append(self.var_storage[node.name])
             else:
-                raise RuntimeError(f"op unaria no conocida: {expr.op}")
+                raise RuntimeError(f"expr rara en codegen: {type(node)}")
+        return values.pop()
+
+    # unary ops (! , -)
+    def _gen_unary(self, expr: UnaryOp, v: str) -> str:
+        tmp = self.new_temp()
 
-            return tmp
+        if expr.op == "-":
+            self.emit(f"{tmp} := 0 - {v}", expr)
+        elif expr.op == "!":
+            # negacion bool simple
+            t1 = self.new_temp()
+            self.emit(f"{t1} := {v} != 0", expr)
+            self.emit(f"{tmp} := 1 - {t1}", expr)
+        else:
+            raise RuntimeError(f"op unaria no conocida: {expr.op}")
 
-        # binary ops (+, <, &&, etc)
-        if isinstance(expr, BinaryOp):
-            left = self.gen_expr(expr.left)
-            right = self.gen_expr(expr.right)
-            tmp = self.new_temp()
-            op = expr.op
+        return tmp
 
-            if op in ("+", "-", "*", "/"):
-                self.emit(f"{tmp} := {left} {op} {right}")
+    # binary ops (+, <, &&, etc)
+    def _gen_binary(self, expr: BinaryOp, left: str, right: str) -> str:
+        tmp = self.new_temp()
+        op = expr.op
 
-            elif op in ("<", "<=", ">", ">=", "==", "!="):
-                self.emit(f"{tmp} := {left} {op} {right}")
+        if op in ("+", "-", "*", "/"):
+            self.emit(f"{tmp} := {left} {op} {right}", expr)
 
-            elif op in ("&&", "||"):
-                # basic impl: usar ints 0/1
-                if op == "&&":
-                    self.emit(f"{tmp} := ({left} != 0) && ({right} != 0)")
-                else:
-                    self.emit(f"{tmp} := ({left} != 0) || ({right} != 0)")
+        elif op in ("<", "<=", ">", ">=", "==", "!="):
+            self.emit(f"{tmp} := {left} {op} {right}", expr)
 
+        elif op in ("&&", "||"):
+            # basic impl: usar ints 0/1
+            if op == "&&":
+                self.emit(f"{tmp} := ({left} != 0) && ({right} != 0)", expr)
             else:
-                raise RuntimeError(f"binary op no conocido: {op}")
+                self.emit(f"{tmp} := ({left} != 0) || ({right} != 0)", expr)
 
-            return tmp
+        else:
+            raise RuntimeError(f"binary op no conocido: {op}")
 
-        raise RuntimeError(f"expr rara en codegen: {type(expr)}")
+        return tmp
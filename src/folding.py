@@ -0,0 +1,223 @@
+# folding.py
+# pase de optimizacion sobre el ast (va despues de la semantica y antes del codegen):
+# dobla constantes, aplica identidades (x*1, x+0, !!b ...) y quita ramas muertas
+
+from typing import List, Optional
+from src.ast_nodes import *
+from src.vm import int_ops, to_int_mode
+
+# op relacional -> su negacion, pa !(a < b) => a >= b
+NEGATED = {"<": ">=", "<=": ">", ">": "<=", ">=": "<", "==": "!=", "!=": "=="}
+
+
+def _const(expr: Expr) -> Optional[int]:
+    # valor de un literal como int del VM (bools son 0/1); None si no es literal
+    if isinstance(expr, IntLiteral):
+        return expr.value
+    if isinstance(expr, BoolLiteral):
+        return 1 if expr.value else 0
+    return None
+
+
+def _literal(value: int, typ: str) -> Expr:
+    node = BoolLiteral(bool(value)) if typ == "bool" else IntLiteral(value)
+    node.inferred_type = typ
+    return node
+
+
+class ConstantFolder:
+    def __init__(self, int_mode: str = "big"):
+        self.folded = 0   # cuantos nodos se quitaron, pa estadisticas
+        # mismos operadores que el vm en ese modo; en "trap" lo que se desborda
+        # no se dobla y se deja pa que truene en runtime
+        self.int_mode = int_mode
+        self.ops = int_ops(int_mode)
+
+    def optimize(self, program: Program) -> Program:
+        return Program(self.fold_list(program.statements))
+
+    def fold_list(self, stmts: List[Stmt]) -> List[Stmt]:
+        out: List[Stmt] = []
+        for s in stmts:
+            out.extend(self.fold_stmt(s))
+        return out
+
+    def fold_block(self, block: Block) -> Block:
+        return Block(self.fold_list(block.statements)).copy_span(block)
+
+    def fold_stmt(self, stmt: Stmt) -> List[Stmt]:
+        # regresa lista porque un stmt puede desaparecer o volverse su bloque;
+        # los stmts nuevos se quedan con el rango del src del original
+        return [s.copy_span(stmt) for s in self._fold_stmt(stmt)]
+
+    def fold_expr(self, expr: Expr) -> Expr:
+        # postorden con pila explicita, sin recursion (exprs generadas enormes);
+        # cada entrada: (nodo, original de donde sale el rango, hijos listos)
+        stack = [(expr, expr, False)]
+        results: List[Expr] = []   # subarboles ya doblados
+        while stack:
+            node, orig, children_done = stack.pop()
+            if not children_done:
+                # !!b => b, --x => x (antes de doblar el de adentro). En "trap"
+                # el - de adentro truena con el minimo de int64: --x se queda
+                while (isinstance(node, UnaryOp) and isinstance(node.expr, UnaryOp)
+                       and node.expr.op == node.op
+                       and (node.op == "!" or self.int_mode != "trap")):
+                    self.folded += 1
+                    node = node.expr.expr
+                if isinstance(node, (IntLiteral, BoolLiteral, VarRef)):
+                    results.append(node.copy_span(orig))
+                elif isinstance(node, BinaryOp):
+                    stack.append((node, orig, True))
+                    stack.append((node.right, node.right, False))
+                    stack.append((node.left, node.left, False))
+                elif isinstance(node, UnaryOp):
+                    stack.append((node, orig, True))
+                    stack.append((node.expr, node.expr, False))
+                else:
+                    raise RuntimeError(f"expr rara en folding: {type(node)}")
+                continue
+
+            if isinstance(node, BinaryOp):
+                right = results.pop()
+                left = results.pop()
+                folded = self._fold_binary(node, left, right)
+            else:
+                folded = self._fold_unary(node, results.pop())
+            # los nodos nuevos se quedan con el rango del src del original
+            results.append(folded.copy_span(node).copy_span(orig))
+        return results.pop()
+
+    def _fold_stmt(self, stmt: Stmt) -> List[Stmt]:
+        if isinstance(stmt, VarDecl):
+            return [stmt]
+
+        if isinstance(stmt, Assign):
+            return [Assign(stmt.name, self.fold_expr(stmt.expr))]
+
+        if isinstance(stmt, PrintStmt):
+            return [PrintStmt(self.fold_expr(stmt.expr))]
+
+        if isinstance(stmt, IfStmt):
+            cond = self.fold_expr(stmt.cond)
+            value = _const(cond)
+            if value is None:
+                else_block = self.fold_block(stmt.else_block) if stmt.else_block else None
+                return [IfStmt(cond, self.fold_block(stmt.then_block), else_block)]
+            # if (true) / if (false): solo queda la rama que si corre
+            self.folded += 1
+            if value:
+                return [self.fold_block(stmt.then_block)]
+            if stmt.else_block:
+                return [self.fold_block(stmt.else_block)]
+            return []
+
+        if isinstance(stmt, WhileStmt):
+            cond = self.fold_expr(stmt.cond)
+            if _const(cond) == 0:
+                # while (false) nunca entra
+                self.folded += 1
+                return []
+            return [WhileStmt(cond, self.fold_block(stmt.body))]
+
+        if isinstance(stmt, Block):
+            return [self.fold_block(stmt)]
+
+        raise RuntimeError(f"stmt raro en folding: {type(stmt)}")
+
+    def _fold_unary(self, expr: UnaryOp, sub: Expr) -> Expr:
+        # sub: el operando ya doblado
+        value = _const(sub)
+        if expr.op == "-":
+            value = self._calc("-", 0, value) if value is not None else None
+            if value is not None:
+                self.folded += 1
+                return _literal(value, "int")
+        elif expr.op == "!":
+            if value is not None:
+                self.folded += 1
+                return _literal(0 if value else 1, "bool")
+            if isinstance(sub, BinaryOp) and sub.op in NEGATED:
+                # !(a < b) => a >= b, una instruc en vez de tres
+                self.folded += 1
+                node = BinaryOp(NEGATED[sub.op], sub.left, sub.right)
+                node.inferred_type = "bool"
+                return node
+            # !b => b == false, una instruc en vez de dos
+            node = BinaryOp("==", sub, _literal(0, "bool"))
+            node.inferred_type = "bool"
+            return node
+        node = UnaryOp(expr.op, sub)
+        node.inferred_type = expr.inferred_type
+        return node
+
+    def _fold_binary(self, expr: BinaryOp, left: Expr, right: Expr) -> Expr:
+        # left/right: los lados ya doblados
+        lv, rv = _const(left), _const(right)
+        op = expr.op
+
+        # los dos lados constantes: se calcula ya con la misma tabla del VM
+        # (division entre cero se deja pa que truene en runtime)
+        if lv is not None and rv is not None and not (op == "/" and rv == 0):
+            value = self._calc(op, lv, rv)
+            if value is not None:
+                self.folded += 1
+                return _literal(value, expr.inferred_type)
+
+        simple = self._identity(op, left, right, lv, rv)
+        if simple is not None:
+            self.folded += 1
+            return simple
+
+        node = BinaryOp(op, left, right)
+        node.inferred_type = expr.inferred_type
+        return node
+
+    def _calc(self, op: str, lv: int, rv: int) -> Optional[int]:
+        # las constantes se llevan al modo igual que en el vm; None si en "trap"
+        # algo no cabe en int64
+        try:
+            return self.ops[op](to_int_mode(lv, self.int_mode), to_int_mode(rv, self.int_mode))
+        except OverflowError:
+            return None
+
+    def _pure(self, expr: Expr) -> bool:
+        # se puede tirar sin evaluar: no truena (var sin valor, /0, overflow en trap)
+        return not can_fault(expr, self.int_mode == "trap")
+
+    def _identity(self, op: str, left: Expr, right: Expr, lv, rv) -> Optional[Expr]:
+        # identidades algebraicas con un lado constante; las que tiran el otro
+        # lado solo si ese lado no puede tronar (el -O0 si lo evalua)
+        if op == "+":
+            if lv == 0:
+                return right
+            if rv == 0:
+                return left
+        elif op == "-":
+            if rv == 0:
+                return left
+        elif op == "*":
+            if lv == 1:
+                return right
+            if rv == 1:
+                return left
+            if (lv == 0 and self._pure(right)) or (rv == 0 and self._pure(left)):
+                return _literal(0, "int")
+        elif op == "/":
+            if rv == 1:
+                return left
+        elif op == "&&":
+            if lv == 1:
+                return right
+            if rv == 1:
+                return left
+            if (lv == 0 and self._pure(right)) or (rv == 0 and self._pure(left)):
+                return _literal(0, "bool")
+        elif op == "||":
+            if lv == 0:
+                return right
+            if rv == 0:
+                return left
+            if (lv == 1 and self._pure(right)) or (rv == 1 and self._pure(left)):
+                return _literal(1, "bool")
+        return None
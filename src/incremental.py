@@ -0,0 +1,202 @@
+# incremental.py
+# recompilacion incremental: cada stmt top-level se identifica por el hash de su
+# texto + los tipos de las vars que nombra; su tac (con temps/labels numerados
+# desde 1) se guarda en disco y al reusarlo solo se renumera. Cache con tope de
+# tamano; se saca lo menos usado (LRU)
+
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional, Set, Tuple
+from src.lexer import Lexer
+from src.parser import Parser
+from src.semantics import SemanticAnalyzer
+from src.folding import ConstantFolder
+from src.codegen import TACGenerator
+from src.tac import parse_line, is_temp
+
+CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class FragmentCache:
+    # un solo archivo json en DIR: key -> [ultimo uso, bytes, fragmento]; se lee
+    # una vez al abrir y se escribe en save() (un archivo por stmt era mas lento
+    # que compilar todo de nuevo)
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+        self._file = os.path.join(path, "fragments.json")
+        self.entries: Dict[str, list] = {}
+        self.clock = 0   # contador de usos, pa el LRU
+        try:
+            with open(self._file) as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data["entries"]
+                self.clock = data["clock"]
+        except (OSError, ValueError, KeyError):
+            pass   # no hay cache o esta roto: se empieza de cero
+
+    def get(self, key: str) -> Optional[dict]:
+        slot = self.entries.get(key)
+        if slot is None:
+            self.misses += 1
+            return None
+        self.clock += 1
+        slot[0] = self.clock
+        self.hits += 1
+        return slot[2]
+
+    def put(self, key: str, entry: dict):
+        self.clock += 1
+        self.entries[key] = [self.clock, len(json.dumps(entry)), entry]
+
+    def save(self):
+        # sacar lo menos usado hasta quedar bajo el tope
+        total = sum(slot[1] for slot in self.entries.values())
+        if total > self.max_bytes:
+            for key in sorted(self.entries, key=lambda k: self.entries[k][0]):
+                total -= self.entries.pop(key)[1]
+                if total <= self.max_bytes:
+                    break
+        tmp = self._file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": CACHE_VERSION, "clock": self.clock,
+                       "entries": self.entries}, f)
+        os.replace(tmp, self._file)   # nunca queda un cache a medio escribir
+
+
+# pa partir el src en stmts basta ver llaves, ';' y comentarios; no hace falta
+# lexear todo (lexear era la mitad del tiempo de un recompile)
+COMMENT = re.compile(r"//[^\n]*")
+SPLIT = re.compile(r"//[^\n]*|[{};]")   # comentarios primero: sus llaves no cuentan
+SKIP = re.compile(r"(?:\s|//[^\n]*)*")
+ELSE = re.compile(r"(?:\s|//[^\n]*)*else\b")
+IDENT = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*")
+
+
+def split_statements(source: str) -> List[Tuple[int, int]]:
+    # (inicio, fin) de cada stmt top-level: termina en ';' fuera de llaves, o al
+    # cerrar su ultima '}' si no sigue un else
+    spans: List[Tuple[int, int]] = []
+    start = SKIP.match(source, 0).end()
+    depth = 0
+    for m in SPLIT.finditer(source):
+        c = m.group()
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0 and not ELSE.match(source, m.end()):
+                spans.append((start, m.end()))
+                start = SKIP.match(source, m.end()).end()
+        elif c == ";" and depth == 0:
+            spans.append((start, m.end()))
+            start = SKIP.match(source, m.end()).end()
+    if start < len(source):
+        spans.append((start, len(source)))   # stmt sin terminar: el parser da el error
+    return spans
+
+
+def _names(text: str) -> List[str]:
+    # ids que nombra el stmt (keywords incluidas, no estorban en la llave)
+    code = COMMENT.sub(" ", text)
+    return sorted(set(IDENT.findall(code)))
+
+
+def _key(text: str, env: Dict[str, str], assigned: Set[str], names: List[str],
+         opt_level: int, int_mode: str = "big") -> str:
+    h = hashlib.sha256()
+    h.update(f"{CACHE_VERSION}|{opt_level}|{text}|".encode())
+    if int_mode != "big":
+        h.update(f"{int_mode}|".encode())   # el folding da otras constantes
+    # si la var ya tiene valor seguro tambien cuenta: el folding solo tira un
+    # operando que no puede tronar
+    for name in names:
+        h.update(f"{name}:{env.get(name, '?')}:{int(name in assigned)};".encode())
+    return h.hexdigest()
+
+
+# en el cache los temps/labels se guardan marcados ($t1, $L1; '$' no sale en el
+# tac) pa que reusar un fragmento sea un solo sub sin volver a parsear
+MARK = re.compile(r"\$([tL])(\d+)")
+
+
+def _template(lines: List[str], variables) -> str:
+    def temp(name: str) -> str:
+        if name and is_temp(name) and name not in variables:
+            return "$" + name
+        return name
+
+    out = []
+    for line in lines:
+        ins = parse_line(line)
+        if ins.label:
+            ins.label = "$" + ins.label
+        ins.dst, ins.a, ins.b = temp(ins.dst), temp(ins.a), temp(ins.b)
+        out.append(str(ins))
+    return "\n".join(out)
+
+
+def _instantiate(template: str, temp_base: int, label_base: int) -> List[str]:
+    if not template:
+        return []
+    if "$" in template:
+        bases = {"t": temp_base, "L": label_base}
+        template = MARK.sub(lambda m: f"{m[1]}{int(m[2]) + bases[m[1]]}", template)
+    return template.split("\n")
+
+
+def compile_incremental(source: str, cache: FragmentCache, opt_level: int = 0,
+                        int_mode: str = "big") -> List[str]:
+    # mismo tac que compile_to_tac hasta -O1 (lo de -O2 se corre despues sobre todo)
+    sem = SemanticAnalyzer()
+    env = sem.env
+    temp_base = label_base = 0
+    tac: List[str] = []
+
+    for start, end in split_statements(source):
+        text = source[start:end]
+        key = _key(text, env, sem.assigned, _names(text), opt_level, int_mode)
+
+        entry = cache.get(key)
+        if entry is None:
+            # fallo: compilar solo este stmt con temps/labels desde 1; se lexea
+            # solo su pedazo pero sobre el texto completo (line:col de siempre)
+            lexer = Lexer(source)
+            lexer.pos, lexer.length = start, end
+            parser = Parser.from_tokens(lexer.tokens())
+            stmt = parser.parse_decl_or_stmt()
+            if parser.curr.kind != "EOF":
+                # sobro algo en el pedazo (ej. un else de mas): mismo error que el parser completo
+                raise SyntaxError(f"Unexpected token in statement: {parser.curr.kind} {parser.curr.value}")
+            before = len(env)
+            had = set(sem.assigned)
+            sem.check_stmt(stmt)
+            stmts = ConstantFolder(int_mode).fold_stmt(stmt) if opt_level >= 1 else [stmt]
+            gen = TACGenerator(short_circuit=opt_level >= 1, overflow=int_mode == "trap")
+            gen.var_storage = {name: name for name in env}
+            lines: List[str] = []
+            for s in stmts:
+                lines += gen.generate_stmt(s)
+            entry = {"tac": _template(lines, env), "temps": gen.temp_count,
+                     "labels": gen.label_count, "decls": list(env.items())[before:],
+                     "assigns": sorted(sem.assigned - had)}
+            cache.put(key, entry)
+        else:
+            # acierto: solo repetir las declaraciones y asignaciones que hacia el stmt
+            for name, typ in entry["decls"]:
+                env[name] = typ
+            sem.assigned.update(entry["assigns"])
+
+        tac += _instantiate(entry["tac"], temp_base, label_base)
+        temp_base += entry["temps"]
+        label_base += entry["labels"]
+
+    cache.save()
+    return tac
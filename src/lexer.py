@@ -1,138 +1,177 @@
 # lexer.py
 # modulo que parte el codigo en tokenes aqui solo se separa todo
+# una sola regex maestra con grupos con nombre; se escanea con match(text, pos)
+# sin copiar el resto del texto, y line/col se sacan solo cuando se piden
 
 import re
+from bisect import bisect_right
+import sys
 from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Union
+
+
+class LineIndex:
+    # offsets donde empieza cada linea, pa pasar de pos a (line, col) con bisect
+    def __init__(self, text: str):
+        self.text = text
+        self._starts: Optional[List[int]] = None
+
+    def line_col(self, pos: int):
+        if self._starts is None:
+            # se arma la primera vez que alguien pide una linea
+            self._starts = [0] + [m.end() for m in NEWLINE.finditer(self.text)]
+        i = bisect_right(self._starts, pos) - 1
+        return i + 1, pos - self._starts[i] + 1
+
+    def token_end(self, pos: int) -> int:
+        # fin del token que empieza en pos (pa el final de un rango en el src)
+        m = MASTER.match(self.text, pos)
+        return m.end() if m else pos + 1
+
+
+class LineStart:
+    # line/col pa tokens que vienen de stream_tokens: solo se sabe donde empieza
+    # la linea de cada token, no hay texto completo
+    __slots__ = ("line", "offset")
+
+    def __init__(self, line: int, offset: int):
+        self.line = line
+        self.offset = offset
+
+    def line_col(self, pos: int):
+        return self.line, pos - self.offset + 1
+
 
 @dataclass
 class Token:
+    __slots__ = ("kind", "value", "pos", "index")   # sin __dict__ por token
     kind: str   # 'ID', 'INT', 'KW', 'OP', '{', '}', '(', ')', ';', ',', 'EOF'
     value: str
-    line: int
-    col: int
+    pos: int    # offset en el texto
+    index: Union[LineIndex, LineStart, None]   # pa sacar line/col
+
+    def __repr__(self) -> str:
+        return f"Token(kind={self.kind!r}, value={self.value!r}, pos={self.pos})"
+
+    @property
+    def line(self) -> int:
+        return self.index.line_col(self.pos)[0] if self.index else 1
+
+    @property
+    def col(self) -> int:
+        return self.index.line_col(self.pos)[1] if self.index else self.pos + 1
+
 
 # palabras clave del leng ojo true/false como bools
 KEYWORDS = {"int", "bool", "if", "else", "while", "print", "true", "false"}
 
 # regex basicos nota: orden importa aqu
 TOKEN_SPEC = [
+    ("SKIP",     r"[ \t\n]+|//[^\n]*"),       # espacios, saltos y comentarios
     ("NUMBER",   r"\d+"),                     # ints
     ("ID",       r"[a-zA-Z_][a-zA-Z0-9_]*"),  # ids normalitos
-    ("OP",       r"<=|>=|==|!=|&&|\|\||[+\-*/<>=!]")  # ops
+    ("OP",       r"<=|>=|==|!=|&&|\|\||[+\-*/<>=!]"),  # ops
+    ("SYMBOL",   r"[{}();,]"),                # simbolos que van solitos
 ]
 
-# espacios (no los necesitamos)
-WHITESPACE = re.compile(r"[ \t]+")
+MASTER = re.compile("|".join(f"(?P<{name}>{rx})" for name, rx in TOKEN_SPEC))
 NEWLINE = re.compile(r"\n")
 
-# simbolos que van solitos
-SYMBOLS = {
-    '{': '{',
-    '}': '}',
-    '(': '(',
-    ')': ')',
-    ';': ';',
-    ',': ','
-}
-
 
 class Lexer:
     def __init__(self, text: str):
         self.text = text
         self.pos = 0
-        self.line = 1
-        self.col = 1
         self.length = len(text)
-
-    # ver siguientes char 
-    def _peek(self, n=1):
-        if self.pos + n <= self.length:
-            return self.text[self.pos:self.pos+n]
-        return ""
-
-    # avanzar posición actualiza col/line
-    def _advance(self, n=1):
-        for _ in range(n):
-            if self.pos >= self.length:
-                return
-            ch = self.text[self.pos]
-            self.pos += 1
-            if ch == '\n':
-                self.line += 1
-                self.col = 1
-            else:
-                self.col += 1
-
-    # intenta hacer match con regex
-    def _match_regex(self, pattern: re.Pattern):
-        m = pattern.match(self.text, self.pos)
-        if m:
-            return m.group(0)
-        return None
-
-    # ignora espacios y comentarios
-    def _skip_whitespace_and_comments(self):
-        while self.pos < self.length:
-            # whitespace normalito
-            m_ws = WHITESPACE.match(self.text, self.pos)
-            if m_ws:
-                self._advance(len(m_ws.group(0)))
-                continue
-
-            # salto de linea
-            m_nl = NEWLINE.match(self.text, self.pos)
-            if m_nl:
-                self._advance(len(m_nl.group(0)))
-                continue
-
-            if self._peek(2) == "//":
-                # avanzar hasta el fin de la linea
-                while self.pos < self.length and self.text[self.pos] != '\n':
-                    self._advance()
-                continue
-
-            break
-
-    # regresa el siguiente token
+        self.index = LineIndex(text)
+        self._stream: Optional[Iterator[Token]] = None
+
+    @property
+    def line(self) -> int:
+        return self.index.line_col(self.pos)[0]
+
+    @property
+    def col(self) -> int:
+        return self.index.line_col(self.pos)[1]
+
+    # generador de tokens; el ultimo siempre es EOF
+    def tokens(self) -> Iterator[Token]:
+        text, index = self.text, self.index
+        match = MASTER.match
+        keywords = KEYWORDS
+        intern = sys.intern
+        pos, length = self.pos, self.length
+        while pos < length:
+            m = match(text, pos)
+            if m is None:
+                self.pos = pos
+                line, col = index.line_col(pos)
+                raise SyntaxError(f"Unexpected char '{text[pos]}' at {line}:{col}")
+            kind = m.lastgroup
+            end = m.end()
+            if kind != "SKIP":
+                value = m.group()
+                if kind == "NUMBER":
+                    kind = "INT"
+                elif kind == "SYMBOL":
+                    kind = value
+                else:
+                    # ids, keywords y ops internados: todos los nodos que
+                    # nombran la misma var comparten un solo string
+                    value = intern(value)
+                    if kind == "ID" and value in keywords:
+                        kind = "KW"
+                self.pos = end
+                yield Token(kind, value, pos, index)
+            pos = end
+        self.pos = pos
+        yield Token("EOF", "", pos, index)
+
+    # todos los tokens de una vez en una lista
+    def tokenize(self) -> List[Token]:
+        return list(self.tokens())
+
+    # regresa el siguiente token (EOF se repite al final)
     def next_token(self) -> Token:
-        self._skip_whitespace_and_comments()
-
-        if self.pos >= self.length:
-            return Token("EOF", "", self.line, self.col)
-
-        ch = self.text[self.pos]
-
-        # smbolos simples
-        if ch in SYMBOLS:
-            tok = Token(SYMBOLS[ch], ch, self.line, self.col)
-            self._advance()
-            return tok
-
-        # numero
-        m = TOKEN_SPEC[0][1]  # regex de NUMBER
-        m_num = re.match(m, self.text[self.pos:])
-        if m_num:
-            value = m_num.group(0)
-            tok = Token("INT", value, self.line, self.col)
-            self._advance(len(value))
-            return tok
-
-        # id o keyword
-        m_id = re.match(TOKEN_SPEC[1][1], self.text[self.pos:])
-        if m_id:
-            value = m_id.group(0)
-            kind = "KW" if value in KEYWORDS else "ID"
-            tok = Token(kind, value, self.line, self.col)
-            self._advance(len(value))
-            return tok
-
-        # operadores (==, <=, &&, etc)
-        m_op = re.match(TOKEN_SPEC[2][1], self.text[self.pos:])
-        if m_op:
-            value = m_op.group(0)
-            tok = Token("OP", value, self.line, self.col)
-            self._advance(len(value))
-            return tok
-
-        # si llega aqui, es caracter inesperado
-        raise SyntaxError(f"Unexpected char '{ch}' at {self.line}:{self.col}")
+        if self._stream is None:
+            self._stream = self.tokens()
+        tok = next(self._stream, None)
+        if tok is None:
+            return Token("EOF", "", self.length, self.index)
+        return tok
+
+
+# tokens leyendo linea por linea (ej. un archivo abierto) sin tener todo el texto;
+# ningun token cruza lineas asi que cada linea se escanea sola
+def stream_tokens(lines: Iterable[str]) -> Iterator[Token]:
+    match = MASTER.match
+    keywords = KEYWORDS
+    intern = sys.intern
+    offset = 0
+    line_no = 0
+    start = LineStart(1, 0)
+    for line_no, text in enumerate(lines, 1):
+        start = LineStart(line_no, offset)
+        pos, length = 0, len(text)
+        while pos < length:
+            m = match(text, pos)
+            if m is None:
+                raise SyntaxError(f"Unexpected char '{text[pos]}' at {line_no}:{pos + 1}")
+            kind = m.lastgroup
+            end = m.end()
+            if kind != "SKIP":
+                value = m.group()
+                if kind == "NUMBER":
+                    kind = "INT"
+                elif kind == "SYMBOL":
+                    kind = value
+                else:
+                    value = intern(value)
+                    if kind == "ID" and value in keywords:
+                        kind = "KW"
+                yield Token(kind, value, offset + pos, start)
+            pos = end
+        offset += length
+        if text.endswith("\n"):
+            start = LineStart(line_no + 1, offset)
+    yield Token("EOF", "", offset, start)
@@ -0,0 +1,491 @@
+# loops.py
+# optimizaciones de loops sobre el cfg del tac (van en -O2 despues de optimize):
+#   - loops naturales: back edge b -> h donde h domina a b (con -O1/-O2 el while
+#     sale rotado, asi que el header es el bloque de la cond y no el del label
+#     de arriba)
+#   - invariantes: lo que no cambia dentro del loop se calcula una vez antes
+#   - reduccion de fuerza: i * k con i var de induccion pasa a una suma por vuelta
+#   - desenrollar loops contados (if i < n goto body) por un factor
+# Todo lo que se saca antes del loop corre aunque el loop de cero vueltas, asi
+# que solo se saca lo que no puede tronar: sin divisiones (salvo entre una
+# constante != 0) y con vars que seguro ya tienen valor. Con int64 "trap" la
+# aritmetica tambien puede tronar (overflow): no se saca, no se reduce (la suma
+# de mas despues de la ultima vuelta se podria desbordar) y con int64 no se
+# desenrolla (la guarda i + (factor - 1) * paso se podria desbordar)
+
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from src.tac import TacInstr, is_const, is_temp
+from src.optimizer import BasicBlock, build_cfg, block_liveness, count, assigned_out, safe
+from src.vm import to_int_mode
+
+# el loop desenrollado no debe pasar de esto (instrucs de todas las copias)
+MAX_UNROLLED = 256
+# rondas de analizar -> editar loops -> volver a analizar
+MAX_ROUNDS = 100
+
+# relacional de la cond de un loop contado -> signo que debe tener el paso
+COUNTED_RELS = {"<": 1, "<=": 1, ">": -1, ">=": -1}
+MIRROR = {"<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+
+@dataclass
+class Loop:
+    header: int                     # bloque que domina a todo el loop
+    blocks: Set[int]
+    latches: List[int]              # bloques con el back edge al header
+    label: str = ""                 # label del header
+    innermost: bool = True          # sin otro loop adentro
+
+
+@dataclass
+class LoopStats:
+    loops: int = 0
+    hoisted: int = 0       # instrucs sacadas del loop
+    reduced: int = 0       # multiplicaciones cambiadas por sumas
+    unrolled: int = 0      # loops desenrollados
+
+    def __str__(self) -> str:
+        return (f"loops: {self.loops} (invariantes sacados: {self.hoisted}, "
+                f"mults reducidas: {self.reduced}, desenrollados: {self.unrolled})")
+
+
+#  analisis
+
+def dominators(blocks: List[BasicBlock]) -> Tuple[List[int], List[int]]:
+    # idom de cada bloque (Cooper/Harvey/Kennedy) y su numero en reverse
+    # postorder; -1 en los dos si no se llega desde la entrada
+    n = len(blocks)
+    postorder: List[int] = []
+    seen = [False] * n
+    seen[0] = True
+    stack = [(0, iter(blocks[0].succs))]
+    while stack:
+        b, succs = stack[-1]
+        for s in succs:
+            if not seen[s]:
+                seen[s] = True
+                stack.append((s, iter(blocks[s].succs)))
+                break
+        else:
+            stack.pop()
+            postorder.append(b)
+    rpo = postorder[::-1]
+    number = [-1] * n
+    for i, b in enumerate(rpo):
+        number[b] = i
+
+    idom = [-1] * n
+    idom[0] = 0
+
+    def intersect(a: int, b: int) -> int:
+        while a != b:
+            while number[a] > number[b]:
+                a = idom[a]
+            while number[b] > number[a]:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+        for b in rpo[1:]:
+            new = -1
+            for p in blocks[b].preds:
+                if idom[p] == -1:
+                    continue
+                new = p if new == -1 else intersect(p, new)
+            if idom[b] != new:
+                idom[b] = new
+                changed = True
+    return idom, number
+
+
+def dominates(idom: List[int], number: List[int], a: int, b: int) -> bool:
+    # los que dominan a b van antes que b en reverse postorder
+    if number[a] == -1 or number[b] == -1:
+        return False
+    while number[b] > number[a]:
+        b = idom[b]
+    return b == a
+
+
+def find_loops(blocks: List[BasicBlock], idom: List[int], number: List[int]) -> List[Loop]:
+    # un loop por header (juntando sus back edges), los de adentro primero
+    latches: Dict[int, List[int]] = {}
+    for b in blocks:
+        for h in b.succs:
+            if dominates(idom, number, h, b.index):
+                latches.setdefault(h, []).append(b.index)
+    loops = []
+    for h, tails in latches.items():
+        body = {h}
+        stack = list(tails)
+        while stack:
+            x = stack.pop()
+            if x in body or idom[x] == -1:
+                continue
+            body.add(x)
+            stack.extend(blocks[x].preds)
+        first = blocks[h].instrs[0]
+        label = first.label if first.kind == "label" else ""
+        loops.append(Loop(h, body, tails, label))
+    for loop in loops:
+        loop.innermost = not any(b in latches and b != loop.header for b in loop.blocks)
+    loops.sort(key=lambda lp: len(lp.blocks))
+    return loops
+
+
+def _live_in(blocks: List[BasicBlock], live_out: List[Set[str]]) -> List[Set[str]]:
+    out = []
+    for b in blocks:
+        live = set(live_out[b.index])
+        for ins in reversed(b.instrs):
+            if ins.dst:
+                live.discard(ins.dst)
+            live.update(ins.uses())
+        out.append(live)
+    return out
+
+
+class _Assigned:
+    # las vars con valor seguro en un punto (name in ...), sin armar el set
+    def __init__(self, bits: int, index: Dict[str, int]):
+        self.bits = bits
+        self.index = index
+
+    def __contains__(self, name: str) -> bool:
+        i = self.index.get(name)
+        return i is not None and bool(self.bits >> i & 1)
+
+
+class _Analysis:
+    # todo lo que necesitan los pases de un loop, sobre el tac de ahorita
+    def __init__(self, instrs: List[TacInstr]):
+        self.instrs = instrs
+        self.blocks = build_cfg(instrs)
+        self.idom, self.number = dominators(self.blocks)
+        self.loops = find_loops(self.blocks, self.idom, self.number)
+
+    @cached_property
+    def live_in(self) -> List[Set[str]]:
+        return _live_in(self.blocks, block_liveness(self.blocks))
+
+    @cached_property
+    def _used(self) -> List[str]:
+        # solo importan las vars que se leen en algun loop
+        return sorted({u for loop in self.loops for ins in self.loop_instrs(loop) for u in ins.uses()})
+
+    @cached_property
+    def _assigned(self) -> List[int]:
+        return assigned_out(self.blocks, self._used, self.number)
+
+    @cached_property
+    def _bit_index(self) -> Dict[str, int]:
+        return {name: i for i, name in enumerate(self._used)}
+
+    def assigned(self, block: int) -> _Assigned:
+        return _Assigned(self._assigned[block], self._bit_index)
+
+    def loop_instrs(self, loop: Loop) -> List[TacInstr]:
+        return [ins for b in sorted(loop.blocks) for ins in self.blocks[b].instrs]
+
+    def loop_defs(self, loop: Loop) -> Dict[str, int]:
+        defs: Dict[str, int] = {}
+        for ins in self.loop_instrs(loop):
+            if ins.dst:
+                defs[ins.dst] = defs.get(ins.dst, 0) + 1
+        return defs
+
+    def exits_live(self, loop: Loop) -> Set[str]:
+        live: Set[str] = set()
+        for b in loop.blocks:
+            for s in self.blocks[b].succs:
+                if s not in loop.blocks:
+                    live |= self.live_in[s]
+        return live
+
+    def preheader(self, loop: Loop) -> Optional[Tuple[TacInstr, _Assigned]]:
+        # (instruc antes de la cual se mete el preheader, vars con valor ahi).
+        # Se puede si solo se entra al loop cayendo al header desde el bloque de
+        # arriba, o con un goto al header
+        h = self.blocks[loop.header]
+        outside = [p for p in h.preds if p not in loop.blocks]
+        if loop.header == 0 and not outside:
+            return h.instrs[0], _Assigned(0, {})
+        if len(outside) != 1:
+            return None
+        p = self.blocks[outside[0]]
+        last = p.instrs[-1]
+        if last.kind == "goto" and last.label == loop.label:
+            return last, self.assigned(p.index)
+        if p.index == loop.header - 1 and not (last.kind == "if" and last.label == loop.label):
+            return h.instrs[0], self.assigned(p.index)
+        return None
+
+
+class _Names:
+    # temps y labels nuevos que no choquen con los que ya hay
+    def __init__(self, instrs: List[TacInstr]):
+        self.temp = self.label = 0
+        for ins in instrs:
+            for name in (ins.dst, ins.a, ins.b):
+                if is_temp(name):
+                    self.temp = max(self.temp, int(name[1:]))
+            if ins.kind == "label" and ins.label[:1] == "L" and ins.label[1:].isdigit():
+                self.label = max(self.label, int(ins.label[1:]))
+
+    def new_temp(self) -> str:
+        self.temp += 1
+        return f"t{self.temp}"
+
+    def new_label(self) -> str:
+        self.label += 1
+        return f"L{self.label}"
+
+
+# un pase no arma el tac nuevo: regresa una edicion, id(instruc) -> lo que va
+# en su lugar (ella misma con algo antes o despues, otra, o nada). Asi los
+# loops que no se tocan entre si se editan todos con un solo analisis
+Edit = Dict[int, List[TacInstr]]
+
+
+def _apply(instrs: List[TacInstr], edit: Edit) -> List[TacInstr]:
+    out: List[TacInstr] = []
+    for ins in instrs:
+        out.extend(edit.get(id(ins), (ins,)))
+    return out
+
+
+#  pases (cada uno regresa su Edit, o None si no cambia nada)
+
+def hoist_invariants(an: _Analysis, loop: Loop, names: _Names,
+                     stats: LoopStats, unroll: int, int_mode: str) -> Optional[Edit]:
+    pre = an.preheader(loop)
+    if pre is None:
+        return None
+    anchor, ready = pre
+    defs = an.loop_defs(loop)
+    blocked = an.live_in[loop.header] | an.exits_live(loop)
+    hoisted: List[TacInstr] = []
+    hoisted_ids: Set[int] = set()
+    moved: Set[str] = set()   # definidos por lo que ya se saco
+    changed = True
+    while changed:
+        changed = False
+        for ins in an.loop_instrs(loop):
+            if ins.kind not in ("copy", "binop") or id(ins) in hoisted_ids:
+                continue
+            # una sola def en el loop y nadie lee el valor de antes ni el de despues
+            if defs[ins.dst] != 1 or ins.dst in blocked or not safe(ins, int_mode):
+                continue
+            if all(u in moved or (u not in defs and u in ready) for u in ins.uses()):
+                hoisted.append(ins)
+                hoisted_ids.add(id(ins))
+                moved.add(ins.dst)
+                changed = True
+    if not hoisted:
+        return None
+    stats.hoisted += len(hoisted)
+    edit: Edit = {i: [] for i in hoisted_ids}
+    edit[id(anchor)] = hoisted + [anchor]
+    return edit
+
+
+def _induction_vars(an: _Analysis, loop: Loop, defs: Dict[str, int]) -> Dict[str, Tuple[int, TacInstr]]:
+    # i := i + c / i := i - c / i := c + i, unica def de i en el loop -> (paso, def)
+    ivs = {}
+    for ins in an.loop_instrs(loop):
+        if ins.kind != "binop" or defs[ins.dst] != 1:
+            continue
+        if ins.op in ("+", "-") and ins.a == ins.dst and is_const(ins.b):
+            ivs[ins.dst] = (int(ins.b) if ins.op == "+" else -int(ins.b), ins)
+        elif ins.op == "+" and ins.b == ins.dst and is_const(ins.a):
+            ivs[ins.dst] = (int(ins.a), ins)
+    return ivs
+
+
+def reduce_strength(an: _Analysis, loop: Loop, names: _Names,
+                    stats: LoopStats, unroll: int, int_mode: str) -> Optional[Edit]:
+    # t := i * k (k invariante) -> s := i * k antes del loop, s := s + paso*k
+    # justo despues de cada i := i + paso, y t := s
+    if int_mode == "trap":
+        return None
+    pre = an.preheader(loop)
+    if pre is None:
+        return None
+    anchor, ready = pre
+    defs = an.loop_defs(loop)
+    ivs = _induction_vars(an, loop, defs)
+
+    def invariant(x: str) -> bool:
+        return is_const(x) or (x not in defs and x in ready)
+
+    before: List[TacInstr] = []
+    edit: Edit = {}
+    sums: Dict[Tuple[str, str], str] = {}     # (i, k) -> s
+    for ins in an.loop_instrs(loop):
+        if ins.kind != "binop" or ins.op != "*":
+            continue
+        if ins.a in ivs and invariant(ins.b):
+            i, k = ins.a, ins.b
+        elif ins.b in ivs and invariant(ins.a):
+            i, k = ins.b, ins.a
+        else:
+            continue
+        if i not in ready:
+            continue   # s := i * k tronaria antes del loop
+        step, iv_def = ivs[i]
+        s = sums.get((i, k))
+        if s is None:
+            s = sums[(i, k)] = names.new_temp()
+            before.append(TacInstr("binop", s, i, "*", k, origin=ins.origin))
+            if is_const(k):
+                update = TacInstr("binop", s, s, "+", str(to_int_mode(step * int(k), int_mode)), origin=iv_def.origin)
+            elif step in (1, -1):
+                update = TacInstr("binop", s, s, "+" if step == 1 else "-", k, origin=iv_def.origin)
+            else:
+                d = names.new_temp()
+                before.append(TacInstr("binop", d, k, "*", str(step), origin=ins.origin))
+                update = TacInstr("binop", s, s, "+", d, origin=iv_def.origin)
+            edit.setdefault(id(iv_def), [iv_def]).append(update)
+        edit[id(ins)] = [TacInstr("copy", ins.dst, s, origin=ins.origin)]
+        stats.reduced += 1
+    if not before:
+        return None
+    edit[id(anchor)] = before + [anchor]
+    return edit
+
+
+def unroll_counted(an: _Analysis, loop: Loop, names: _Names,
+                   stats: LoopStats, unroll: int, int_mode: str) -> Optional[Edit]:
+    # loop rotado como lo saca el codegen con -O1/-O2:
+    #       goto Ltest              goto Lu_test
+    #   Lbody:                  Lu_body:
+    #       cuerpo                  cuerpo x factor (la cond no se checa en medio)
+    #   Ltest:                  Lu_test:
+    #       if i < n goto Lbody     tu := i + (factor - 1) * paso
+    #                               if tu < n goto Lu_body
+    #                               goto Ltest
+    #                           Lbody: ... (el loop original hace las que sobran)
+    if unroll < 2 or int_mode != "big":
+        return None
+    blocks = an.blocks
+    header = blocks[loop.header]
+    if len(header.instrs) != 2 or header.instrs[1].kind != "if":
+        return None
+    test = header.instrs[1]
+    first = min(loop.blocks)
+    if (sorted(loop.blocks) != list(range(first, loop.header + 1))
+            or blocks[first].instrs[0].kind != "label"
+            or blocks[first].instrs[0].label != test.label):
+        return None
+    if not loop.innermost:
+        return None
+
+    # se entra con un goto al test (no cayendo)
+    outside = [p for p in header.preds if p not in loop.blocks]
+    if len(outside) != 1:
+        return None
+    entry = blocks[outside[0]].instrs[-1]
+    if entry.kind != "goto" or entry.label != loop.label:
+        return None
+
+    body = [ins for b in range(first, loop.header) for ins in blocks[b].instrs]
+    size = count(body)
+    if size == 0 or size * unroll > MAX_UNROLLED:
+        return None
+    body_labels = [ins.label for ins in body if ins.kind == "label"]
+    if any(ins.kind in ("goto", "if") and ins.label not in body_labels for ins in body):
+        return None
+
+    # if i rel n goto body, con i de induccion y n invariante
+    defs = an.loop_defs(loop)
+    ivs = _induction_vars(an, loop, defs)
+    i, rel, n = test.a, test.op, test.b
+    if i not in ivs and n in ivs and rel in MIRROR:
+        i, rel, n = n, MIRROR[rel], i
+    if i not in ivs or rel not in COUNTED_RELS or not (is_const(n) or n not in defs):
+        return None
+    step, iv_def = ivs[i]
+    if step * COUNTED_RELS[rel] <= 0:
+        return None
+    # la def de i corre una vez por vuelta: su bloque domina a los latches
+    iv_block = next(b for b in loop.blocks if any(ins is iv_def for ins in blocks[b].instrs))
+    if not all(dominates(an.idom, an.number, iv_block, t) for t in loop.latches):
+        return None
+
+    # temps que solo viven dentro de una vuelta: nombres nuevos en cada copia
+    # (si no, la misma var se escribiria y leeria en todas las copias)
+    carried = an.live_in[first] | an.live_in[loop.header]
+    # (en el orden del cuerpo, no de un set: asi el tac sale igual en cada corrida)
+    local = list(dict.fromkeys(ins.dst for ins in body
+                               if ins.dst and is_temp(ins.dst) and ins.dst not in carried))
+
+    u_body, u_test = names.new_label(), names.new_label()
+    unrolled = [TacInstr("goto", label=u_test, origin=entry.origin),
+                TacInstr("label", label=u_body)]
+    for _ in range(unroll):
+        rename = {name: names.new_temp() for name in local}
+        rename.update({label: names.new_label() for label in body_labels})
+        for ins in body:
+            unrolled.append(TacInstr(ins.kind, rename.get(ins.dst, ins.dst),
+                                     rename.get(ins.a, ins.a), ins.op, rename.get(ins.b, ins.b),
+                                     rename.get(ins.label, ins.label), ins.origin))
+    tu = names.new_temp()
+    unrolled += [TacInstr("label", label=u_test),
+                 TacInstr("binop", tu, i, "+", str((unroll - 1) * step), origin=test.origin),
+                 TacInstr("if", a=tu, op=rel, b=n, label=u_body, origin=test.origin),
+                 TacInstr("goto", label=loop.label, origin=entry.origin)]
+    stats.unrolled += 1
+    return {id(entry): unrolled}
+
+
+LOOP_PASSES: List[Tuple[str, Callable]] = [
+    ("invariantes", hoist_invariants),
+    ("reduccion", reduce_strength),
+    ("desenrollar", unroll_counted),
+]
+
+
+def optimize_loops(instrs: List[TacInstr], unroll: int = 1,
+                   int_mode: str = "big") -> Tuple[List[TacInstr], LoopStats]:
+    # unroll: factor de desenrollado (1 = no desenrollar)
+    # int_mode: modo de enteros del vm (ver vm.int_ops)
+    stats = LoopStats()
+    if not instrs:
+        return instrs, stats
+    names = _Names(instrs)
+    done: Set[Tuple[str, str]] = set()    # (label del header, pase) ya corridos
+    # por ronda: un analisis y a lo mas un pase por loop, solo en loops que no
+    # se enciman con otro ya editado en la ronda (los de adentro van primero)
+    for _ in range(MAX_ROUNDS):
+        an = _Analysis(instrs)
+        if not stats.loops:
+            stats.loops = len(an.loops)   # los del programa (no los que salen de desenrollar)
+        edit: Edit = {}
+        touched: Set[int] = set()
+        for loop in an.loops:
+            if not loop.label or loop.blocks & touched:
+                continue
+            for name, run_pass in LOOP_PASSES:
+                if (loop.label, name) in done:
+                    continue
+                delta = LoopStats()
+                change = run_pass(an, loop, names, delta, unroll, int_mode)
+                if change is None:
+                    done.add((loop.label, name))
+                    continue
+                if not change.keys() & edit.keys():
+                    done.add((loop.label, name))
+                    edit.update(change)
+                    touched |= loop.blocks
+                    stats.hoisted += delta.hoisted
+                    stats.reduced += delta.reduced
+                    stats.unrolled += delta.unrolled
+                break
+        if not edit:
+            break
+        instrs = _apply(instrs, edit)
+    return instrs, stats
@@ -0,0 +1,464 @@
+# optimizer.py
+# optimizador del tac: arma bloques basicos y el cfg a partir de labels/goto/if
+# y corre pases de flujo de datos (inalcanzable, copias, cse, stores muertos)
+
+from dataclasses import dataclass, field
+from functools import partial
+from typing import List, Dict, Set, Optional, Tuple, Callable
+from src.tac import TacInstr, parse_program, format_program, is_const, is_temp
+from src.vm import int_ops, to_int_mode
+
+COMMUTATIVE = {"+", "*", "==", "!=", "&&", "||"}
+
+
+@dataclass
+class BasicBlock:
+    index: int
+    instrs: List[TacInstr]
+    succs: List[int] = field(default_factory=list)
+    preds: List[int] = field(default_factory=list)
+
+
+def build_cfg(instrs: List[TacInstr]) -> List[BasicBlock]:
+    # lideres: la primera instruc, cada label y lo que sigue a un goto/if
+    blocks: List[BasicBlock] = []
+    current: List[TacInstr] = []
+    for ins in instrs:
+        if ins.kind == "label" and current:
+            blocks.append(BasicBlock(len(blocks), current))
+            current = []
+        current.append(ins)
+        if ins.kind in ("goto", "if"):
+            blocks.append(BasicBlock(len(blocks), current))
+            current = []
+    if current:
+        blocks.append(BasicBlock(len(blocks), current))
+
+    where: Dict[str, int] = {}
+    for b in blocks:
+        for ins in b.instrs:
+            if ins.kind == "label":
+                where[ins.label] = b.index
+
+    for b in blocks:
+        last = b.instrs[-1]
+        if last.kind in ("goto", "if"):
+            b.succs.append(where[last.label])
+        if last.kind != "goto" and b.index + 1 < len(blocks):
+            if b.index + 1 not in b.succs:
+                b.succs.append(b.index + 1)
+        for s in b.succs:
+            blocks[s].preds.append(b.index)
+    return blocks
+
+
+def flatten(blocks: List[BasicBlock]) -> List[TacInstr]:
+    return [ins for b in blocks for ins in b.instrs]
+
+
+def count(instrs: List[TacInstr]) -> int:
+    # los labels no cuentan como instruc
+    return sum(1 for ins in instrs if ins.kind != "label")
+
+
+def _names(ins: TacInstr) -> List[str]:
+    return ins.uses()
+
+
+def block_liveness(blocks: List[BasicBlock]) -> List[Set[str]]:
+    # live-out de cada bloque (todas las vars y temps)
+    use: List[Set[str]] = []
+    defs: List[Set[str]] = []
+    for b in blocks:
+        u: Set[str] = set()
+        d: Set[str] = set()
+        for ins in b.instrs:
+            for name in _names(ins):
+                if name not in d:
+                    u.add(name)
+            if ins.dst:
+                d.add(ins.dst)
+        use.append(u)
+        defs.append(d)
+
+    live_in: List[Set[str]] = [set() for _ in blocks]
+    live_out: List[Set[str]] = [set() for _ in blocks]
+    changed = True
+    while changed:
+        changed = False
+        for b in reversed(blocks):
+            out: Set[str] = set()
+            for s in b.succs:
+                out |= live_in[s]
+            new_in = use[b.index] | (out - defs[b.index])
+            if out != live_out[b.index] or new_in != live_in[b.index]:
+                live_out[b.index] = out
+                live_in[b.index] = new_in
+                changed = True
+    return live_out
+
+
+def _assign(cur: int, ins: TacInstr, bit: Dict[str, int]) -> int:
+    # bits de vars con valor despues de ins
+    if not ins.dst or ins.dst not in bit:
+        return cur
+    if ins.kind == "copy" and not is_const(ins.a) and not cur & bit.get(ins.a, 0):
+        return cur & ~bit[ins.dst]   # copiar algo sin valor no le da valor
+    return cur | bit[ins.dst]
+
+
+def assigned_out(blocks: List[BasicBlock], names: List[str],
+                 number: Optional[List[int]] = None) -> List[int]:
+    # de names, las que tienen valor seguro al final de cada bloque (por todos
+    # los caminos); como bits de un int (bit i = names[i]) pa que el meet sea un &.
+    # number: orden en que se recorren los bloques (-1 = inalcanzable)
+    bit = {name: 1 << i for i, name in enumerate(names)}
+    outs: List[Optional[int]] = [None] * len(blocks)
+    if number is None:
+        order = blocks
+    else:
+        order = sorted((b for b in blocks if number[b.index] != -1), key=lambda b: number[b.index])
+    changed = True
+    while changed:
+        changed = False
+        for b in order:
+            cur = _assigned_in(b, outs)
+            if cur is None:
+                continue
+            for ins in b.instrs:
+                cur = _assign(cur, ins, bit)
+            if cur != outs[b.index]:
+                outs[b.index] = cur
+                changed = True
+    return [o or 0 for o in outs]
+
+
+def _assigned_in(b: BasicBlock, outs: List[Optional[int]]) -> Optional[int]:
+    # meet de los preds ya calculados; None si ninguno lo esta
+    if b.index == 0:
+        return 0
+    cur: Optional[int] = None
+    for p in b.preds:
+        if outs[p] is not None:
+            cur = outs[p] if cur is None else cur & outs[p]
+    return cur
+
+
+def safe(ins: TacInstr, int_mode: str = "big") -> bool:
+    # se puede correr de mas (o no correr) sin cambiar si truena: la division
+    # entre 0 si truena, y en "trap" tambien la aritmetica que se desborda
+    if int_mode == "trap" and ins.op in ("+", "-", "*", "/"):
+        return False
+    return ins.op != "/" or (is_const(ins.b) and int(ins.b) != 0)
+
+
+#  pases
+
+def remove_unreachable(instrs: List[TacInstr]) -> List[TacInstr]:
+    if not instrs:
+        return instrs
+    blocks = build_cfg(instrs)
+    seen = {0}
+    stack = [0]
+    while stack:
+        for s in blocks[stack.pop()].succs:
+            if s not in seen:
+                seen.add(s)
+                stack.append(s)
+    kept = flatten([b for b in blocks if b.index in seen])
+
+    # saltos al label que sigue no hacen nada
+    out: List[TacInstr] = []
+    for i, ins in enumerate(kept):
+        if ins.kind in ("goto", "if"):
+            j = i + 1
+            while j < len(kept) and kept[j].kind == "label":
+                if kept[j].label == ins.label:
+                    break
+                j += 1
+            if j < len(kept) and kept[j].kind == "label" and kept[j].label == ins.label:
+                continue
+        out.append(ins)
+
+    # labels a los que nadie salta (ej. el then_label de IfStmt)
+    targets = {ins.label for ins in out if ins.kind in ("goto", "if")}
+    return [ins for ins in out if ins.kind != "label" or ins.label in targets]
+
+
+def _coalescible(instrs: List[TacInstr], live_out: Set[str]) -> List[bool]:
+    # por instruc: es x := t (t temp) y t ya no se lee despues (hasta que se
+    # redefine); una sola pasada hacia atras con los vivos
+    live = set(live_out)
+    out = [False] * len(instrs)
+    for j in range(len(instrs) - 1, -1, -1):
+        ins = instrs[j]
+        if ins.kind == "copy" and is_temp(ins.a) and ins.a != ins.dst:
+            out[j] = ins.a not in live
+        if ins.dst:
+            live.discard(ins.dst)
+        live.update(_names(ins))
+    return out
+
+
+def _coalesce(block: BasicBlock, live_out: Set[str]):
+    # t := a op b ; x := t  =>  x := a op b   (si t ya no se usa despues).
+    # Se arma la lista nueva de una pasada; last_def / last_use: donde (en la
+    # nueva) se definio / leyo cada nombre por ultima vez
+    dead = _coalescible(block.instrs, live_out)
+    out: List[TacInstr] = []
+    last_def: Dict[str, int] = {}
+    last_use: Dict[str, int] = {}
+    for j, ins in enumerate(block.instrs):
+        if dead[j]:
+            t, x = ins.a, ins.dst
+            i = last_def.get(t, -1)
+            # entre la def de t y la copia nadie debe tocar t ni x
+            if (i >= 0 and last_use.get(t, -1) <= i and last_use.get(x, -1) <= i
+                    and last_def.get(x, -1) < i):
+                d = out[i]
+                out[i] = TacInstr(d.kind, x, d.a, d.op, d.b, d.label, d.origin)
+                del last_def[t]
+                last_def[x] = i
+                continue
+        for name in _names(ins):
+            last_use[name] = len(out)
+        if ins.dst:
+            last_def[ins.dst] = len(out)
+        out.append(ins)
+    block.instrs = out
+
+
+def _fold(ins: TacInstr, int_mode: str = "big") -> TacInstr:
+    # operacion con dos constantes (despues de propagar) se calcula ya, con los
+    # operadores y las constantes llevadas al modo de enteros igual que en el vm
+    try:
+        if ins.op and is_const(ins.a) and is_const(ins.b):
+            a, b = to_int_mode(int(ins.a), int_mode), to_int_mode(int(ins.b), int_mode)
+            if ins.op == "/" and b == 0:
+                return ins   # que truene en runtime
+            value = int_ops(int_mode)[ins.op](a, b)
+            if ins.kind == "if":
+                return TacInstr("goto", label=ins.label, origin=ins.origin) if value else None
+            return TacInstr("copy" if ins.kind != "print" else "print", ins.dst, str(value),
+                            origin=ins.origin)
+        if ins.kind == "if" and not ins.op and is_const(ins.a):
+            taken = to_int_mode(int(ins.a), int_mode)
+            return TacInstr("goto", label=ins.label, origin=ins.origin) if taken else None
+    except OverflowError:
+        return ins   # en "trap" no cabe en int64: que truene en runtime
+    return ins
+
+
+def _users(copies: Dict[str, str]) -> Dict[str, Set[str]]:
+    # indice al reves de las copias: y -> {x | x := y}
+    users: Dict[str, Set[str]] = {}
+    for k, v in copies.items():
+        users.setdefault(v, set()).add(k)
+    return users
+
+
+def _kill(copies: Dict[str, str], users: Dict[str, Set[str]], name: str):
+    # name cambia: se olvida su copia y las que lo copiaban
+    src = copies.pop(name, None)
+    if src is not None:
+        users[src].discard(name)
+    for k in users.pop(name, ()):
+        del copies[k]
+
+
+def _record(copies: Dict[str, str], users: Dict[str, Set[str]], ins: TacInstr):
+    # efecto de ins sobre las copias disponibles
+    if ins.dst:
+        _kill(copies, users, ins.dst)
+        if ins.kind == "copy" and ins.a != ins.dst:
+            copies[ins.dst] = ins.a
+            users.setdefault(ins.a, set()).add(ins.dst)
+
+
+def propagate_copies(instrs: List[TacInstr], int_mode: str = "big") -> List[TacInstr]:
+    if not instrs:
+        return instrs
+    blocks = build_cfg(instrs)
+    live_out = block_liveness(blocks)
+    for b in blocks:
+        _coalesce(b, live_out[b.index])
+
+    # copias disponibles al final de cada bloque: x -> y (y es var o constante)
+    def transfer(b: BasicBlock, copies: Dict[str, str]) -> Dict[str, str]:
+        copies = dict(copies)
+        users = _users(copies)
+        for ins in b.instrs:
+            _record(copies, users, ins)
+        return copies
+
+    # None = todavia sin calcular (el "todo" del meet)
+    outs: List[Optional[Dict[str, str]]] = [None] * len(blocks)
+    ins_: List[Dict[str, str]] = [{} for _ in blocks]
+    changed = True
+    while changed:
+        changed = False
+        for b in blocks:
+            if b.index == 0:
+                cur: Dict[str, str] = {}
+            else:
+                cur = None
+                for p in b.preds:
+                    if outs[p] is None:
+                        continue
+                    if cur is None:
+                        cur = dict(outs[p])
+                    else:
+                        cur = {k: v for k, v in cur.items() if outs[p].get(k) == v}
+                if cur is None:
+                    continue   # ningun pred calculado todavia
+            ins_[b.index] = cur
+            new_out = transfer(b, cur)
+            if new_out != outs[b.index]:
+                outs[b.index] = new_out
+                changed = True
+
+    # reescribir los usos con las copias disponibles
+    for b in blocks:
+        copies = dict(ins_[b.index])
+        users = _users(copies)
+        new_instrs: List[TacInstr] = []
+        for ins in b.instrs:
+            if ins.kind != "label":
+                a = copies.get(ins.a, ins.a) if ins.a else ins.a
+                bb = copies.get(ins.b, ins.b) if ins.op and ins.b else ins.b
+                ins = _fold(TacInstr(ins.kind, ins.dst, a, ins.op, bb, ins.label, ins.origin),
+                            int_mode)
+                if ins is None:
+                    continue
+            _record(copies, users, ins)
+            new_instrs.append(ins)
+        b.instrs = new_instrs
+    return flatten(blocks)
+
+
+def eliminate_common_subexprs(instrs: List[TacInstr]) -> List[TacInstr]:
+    # cse local: dentro de cada bloque, a op b ya calculado => copia del que lo tiene
+    blocks = build_cfg(instrs) if instrs else []
+    for b in blocks:
+        avail: Dict[Tuple[str, str, str], str] = {}
+        new_instrs: List[TacInstr] = []
+        for ins in b.instrs:
+            if ins.kind == "binop":
+                key = (ins.op, ins.a, ins.b)
+                if ins.op in COMMUTATIVE and ins.b < ins.a:
+                    key = (ins.op, ins.b, ins.a)
+                holder = avail.get(key)
+                if holder is not None and holder != ins.dst:
+                    ins = TacInstr("copy", ins.dst, holder, origin=ins.origin)
+            if ins.dst:
+                d = ins.dst
+                for k in [k for k, v in avail.items() if v == d or d in (k[1], k[2])]:
+                    del avail[k]
+                if ins.kind == "binop" and d not in (ins.a, ins.b):
+                    avail[key] = d
+            new_instrs.append(ins)
+        b.instrs = new_instrs
+    return flatten(blocks)
+
+
+def _sweep(b: BasicBlock, live_out: Set[str], keep: Callable[[int], bool]) -> List[int]:
+    # quita de b los stores muertos (destino que nadie lee despues, o x := x)
+    # salvo los que keep(i) pide dejar; regresa los indices de los muertos
+    live = set(live_out)
+    kept: List[TacInstr] = []
+    dead: List[int] = []
+    for i in range(len(b.instrs) - 1, -1, -1):
+        ins = b.instrs[i]
+        if ins.dst:
+            if ins.dst not in live or (ins.kind == "copy" and ins.a == ins.dst):
+                dead.append(i)
+                if not keep(i):
+                    continue
+            live.discard(ins.dst)
+        live.update(_names(ins))
+        kept.append(ins)
+    kept.reverse()
+    b.instrs = kept
+    return dead
+
+
+def eliminate_dead_stores(instrs: List[TacInstr], int_mode: str = "big") -> List[TacInstr]:
+    # asignaciones cuyo destino nadie lee despues (solo print es observable).
+    # Una que puede tronar se queda (en -O0 truena): lee una var que a lo mejor
+    # no tiene valor, divide entre algo que no es constante != 0 o, en "trap",
+    # hace aritmetica que se puede desbordar
+    if not instrs:
+        return instrs
+    blocks = build_cfg(instrs)
+    live_out = block_liveness(blocks)
+    # primero quitando todos (los mas que pueden salir), pa saber que vars leen
+    dead = {b.index: _sweep(BasicBlock(b.index, b.instrs), live_out[b.index], lambda i: False)
+            for b in blocks}
+    names = sorted({u for b in blocks for i in dead[b.index] for u in _names(b.instrs[i])})
+    bit = {name: 1 << i for i, name in enumerate(names)}
+    outs = assigned_out(blocks, names)
+    for b in blocks:
+        if not dead[b.index]:
+            continue
+        cur = _assigned_in(b, outs) or 0
+        ready: List[int] = []   # vars con valor antes de cada instruc
+        for ins in b.instrs:
+            ready.append(cur)
+            cur = _assign(cur, ins, bit)
+
+        def keep(i: int) -> bool:
+            ins = b.instrs[i]
+            return not safe(ins, int_mode) or any(not ready[i] & bit[u] for u in _names(ins))
+
+        _sweep(b, live_out[b.index], keep)
+    return flatten(blocks)
+
+
+PASSES: List[Tuple[str, Callable[[List[TacInstr]], List[TacInstr]]]] = [
+    ("inalcanzable", remove_unreachable),
+    ("copias", propagate_copies),
+    ("cse", eliminate_common_subexprs),
+    ("stores muertos", eliminate_dead_stores),
+]
+
+
+@dataclass
+class PassStats:
+    before: int = 0
+    after: int = 0
+    removed: Dict[str, int] = field(default_factory=dict)   # pase -> instrucs quitadas
+
+    def __str__(self) -> str:
+        lines = [f"{'pase':<16}{'quitadas':>10}"]
+        for name, n in self.removed.items():
+            lines.append(f"{name:<16}{n:>10}")
+        lines.append(f"instrucciones: {self.before} -> {self.after}")
+        return "\n".join(lines)
+
+
+def optimize(instrs: List[TacInstr], max_rounds: int = 10,
+             int_mode: str = "big") -> Tuple[List[TacInstr], PassStats]:
+    stats = PassStats(before=count(instrs))
+    for name, _ in PASSES:
+        stats.removed[name] = 0
+    # el doblado de constantes (dentro de propagar copias) y lo que puede tronar
+    # (stores muertos) dependen del modo de enteros
+    passes = [(name, partial(run_pass, int_mode=int_mode)
+               if run_pass in (propagate_copies, eliminate_dead_stores) else run_pass)
+              for name, run_pass in PASSES]
+    # se repite hasta que ningun pase cambie nada
+    for _ in range(max_rounds):
+        start = format_program(instrs)
+        for name, run_pass in passes:
+            n = count(instrs)
+            instrs = run_pass(instrs)
+            stats.removed[name] += n - count(instrs)
+        if format_program(instrs) == start:
+            break
+    stats.after = count(instrs)
+    return instrs, stats
+
+
+def optimize_text(lines: List[str]) -> Tuple[List[str], PassStats]:
+    instrs, stats = optimize(parse_program(lines))
+    return format_program(instrs), stats
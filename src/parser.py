@@ -1,15 +1,45 @@
 # parser.py
 # parser del leng, aqui armamos el AST a partir de los tokens
 
-from typing import List
+from typing import Iterable, Iterator, List, Optional
 from src.lexer import Lexer, Token
 from src.ast_nodes import *
 
+# precedencia de los ops binarios, de menor a mayor
+BINARY_PREC = {
+    "||": 1,
+    "&&": 2,
+    "<": 3, "<=": 3, ">": 3, ">=": 3, "==": 3, "!=": 3,
+    "+": 4, "-": 4,
+    "*": 5, "/": 5,
+}
+
+
 class Parser:
-    def __init__(self, text: str):
-        # lexer listo para partir el texto
-        self.lexer = Lexer(text)
-        self.curr = self.lexer.next_token()   # token actual (lo que estamos viendo)
+    def __init__(self, text: Optional[str], tokens: Optional[Iterable[Token]] = None):
+        # lexer listo para partir el texto; o tokens ya hechos (ej. stream_tokens)
+        if tokens is None:
+            self.lexer = Lexer(text)
+            tokens = self.lexer.tokens()
+        else:
+            self.lexer = None
+        self._tokens = iter(tokens)
+        self._eof: Optional[Token] = None
+        self.curr = self._next_token()   # token actual (lo que estamos viendo)
+        self.prev: Optional[Token] = None   # ultimo token consumido (fin de los nodos)
+
+    @classmethod
+    def from_tokens(cls, tokens: Iterable[Token]) -> "Parser":
+        return cls(None, tokens)
+
+    def _next_token(self) -> Token:
+        # EOF se repite al final
+        tok = next(self._tokens, None)
+        if tok is None:
+            return self._eof
+        if tok.kind == "EOF":
+            self._eof = tok
+        return tok
 
     # funcion para consumir token esperado
     def _eat(self, kind=None, value=None):
@@ -18,19 +48,23 @@ class Parser:
             raise SyntaxError(f"Expected {kind}, got {self.curr.kind} at {self.curr.line}:{self.curr.col}")
         if value is not None and self.curr.value != value:
             raise SyntaxError(f"Expected '{value}', got '{self.curr.value}' at {self.curr.line}:{self.curr.col}")
-        self.curr = self.lexer.next_token()   # avanzar al sig token
+        self.prev = self.curr
+        self.curr = self._next_token()   # avanzar al sig token
 
     # programa -> lista de statements/decls
     def parse(self) -> Program:
-        stmts: List[Stmt] = []
+        return Program(list(self.iter_statements()))
+
+    # stmts top-level uno por uno, sin armar el Program completo
+    def iter_statements(self) -> Iterator[Stmt]:
         while self.curr.kind != "EOF":
-            stmts.append(self.parse_decl_or_stmt())
-        return Program(stmts)
+            yield self.parse_decl_or_stmt()
 
     # ver si es declaracion (int x;) o stmt normal
     def parse_decl_or_stmt(self) -> Stmt:
         # tipo de variable int/bool
         if self.curr.kind == "KW" and self.curr.value in ("int", "bool"):
+            start = self.curr
             var_type = self.curr.value
             self._eat("KW")
             if self.curr.kind != "ID":
@@ -38,7 +72,7 @@ class Parser:
             name = self.curr.value
             self._eat("ID")
             self._eat(";")
-            return VarDecl(var_type, name)
+            return VarDecl(var_type, name).at(start.pos, self.prev.pos)
 
         # si no era declaracion, es stmt
         return self.parse_stmt()
@@ -63,6 +97,7 @@ class Parser:
 
         # asignacion: ID = expr;
         if self.curr.kind == "ID":
+            start = self.curr
             name = self.curr.value
             self._eat("ID")
             # debe  '='
@@ -71,21 +106,23 @@ class Parser:
             self._eat("OP")
             expr = self.parse_expr()
             self._eat(";")
-            return Assign(name, expr)
+            return Assign(name, expr).at(start.pos, self.prev.pos)
 
         raise SyntaxError(f"Unexpected token in statement: {self.curr.kind} {self.curr.value}")
 
 
     def parse_block(self) -> Block:
+        start = self.curr
         self._eat("{")
         stmts: List[Stmt] = []
         while self.curr.kind != "}":
             stmts.append(self.parse_decl_or_stmt())
         self._eat("}")
-        return Block(stmts)
+        return Block(stmts).at(start.pos, self.prev.pos)
 
     # if (expr)  else 
     def parse_if(self) -> IfStmt:
+        start = self.curr
         self._eat("KW", "if")
         self._eat("(")
         cond = self.parse_expr()
@@ -98,114 +135,110 @@ class Parser:
             self._eat("KW", "else")
             else_block = self.parse_block()
 
-        return IfStmt(cond, then_block, else_block)
+        return IfStmt(cond, then_block, else_block).at(start.pos, self.prev.pos)
 
     # while (cond) bloque
     def parse_while(self) -> WhileStmt:
+        start = self.curr
         self._eat("KW", "while")
         self._eat("(")
         cond = self.parse_expr()
         self._eat(")")
         body = self.parse_block()
-        return WhileStmt(cond, body)
+        return WhileStmt(cond, body).at(start.pos, self.prev.pos)
 
     # print(expr)
     def parse_print(self) -> PrintStmt:
+        start = self.curr
         self._eat("KW", "print")
         self._eat("(")
         expr = self.parse_expr()
         self._eat(")")
         self._eat(";")
-        return PrintStmt(expr)
+        return PrintStmt(expr).at(start.pos, self.prev.pos)
 
     #  EXPRESIONES 
+    # precedence climbing con pilas explicitas en vez de una funcion por nivel:
+    # ni cadenas largas (a + a + ... + a) ni parentesis/unarios anidados gastan
+    # frames de python. Todos los binarios asocian a la izq; los unarios pegan mas
     def parse_expr(self):
-        return self.parse_or()
-
-    # or: expr1 || expr2
-    def parse_or(self):
-        node = self.parse_and()
-        while self.curr.kind == "OP" and self.curr.value == "||":
-            op = self.curr.value
-            self._eat("OP")
-            right = self.parse_and()
-            node = BinaryOp(op, node, right)
-        return node
-
-    # and: expr1 && expr2
-    def parse_and(self):
-        node = self.parse_rel()
-        while self.curr.kind == "OP" and self.curr.value == "&&":
-            op = self.curr.value
-            self._eat("OP")
-            right = self.parse_rel()
-            node = BinaryOp(op, node, right)
-        return node
-
-    # relacional: < <= > >= == !=
-    def parse_rel(self):
-        node = self.parse_add()
-        while self.curr.kind == "OP" and self.curr.value in ("<", "<=", ">", ">=", "==", "!="):
-            op = self.curr.value
-            self._eat("OP")
-            right = self.parse_add()
-            node = BinaryOp(op, node, right)
-        return node
-
-    # suma/resta
-    def parse_add(self):
-        node = self.parse_mul()
-        while self.curr.kind == "OP" and self.curr.value in ("+", "-"):
-            op = self.curr.value
-            self._eat("OP")
-            right = self.parse_mul()
-            node = BinaryOp(op, node, right)
-        return node
-
-    # multiplicacion/div
-    def parse_mul(self):
-        node = self.parse_unary()
-        while self.curr.kind == "OP" and self.curr.value in ("*", "/"):
-            op = self.curr.value
-            self._eat("OP")
-            right = self.parse_unary()
-            node = BinaryOp(op, node, right)
-        return node
-
-    # unary !x o -x
-    def parse_unary(self):
-        if self.curr.kind == "OP" and self.curr.value in ("!", "-"):
-            op = self.curr.value
-            self._eat("OP")
-            expr = self.parse_unary()
-            return UnaryOp(op, expr)
-        return self.parse_primary()
-
-    # primarios numeros, bools, vars y expr
+        operands = []   # (nodo, pos de su ultimo token, contando el ')' si iba entre parentesis)
+        ops = []        # ("(", "", 0) | ("u", op, pos del op) | ("b", op, precedencia)
+        depth = 0       # parentesis abiertos dentro de esta expr
+
+        def reduce():
+            _, op, _ = ops.pop()
+            right, last = operands.pop()
+            left, _ = operands.pop()
+            operands.append((BinaryOp(op, left, right).at(left.pos, last), last))
+
+        while True:
+            # lugar de operando: unarios y '(' que abren, luego un primario
+            while True:
+                if self.curr.kind == "OP" and self.curr.value in ("!", "-"):
+                    ops.append(("u", self.curr.value, self.curr.pos))
+                    self._eat("OP")
+                elif self.curr.kind == "(":
+                    ops.append(("(", "", 0))
+                    depth += 1
+                    self._eat("(")
+                else:
+                    break
+            operands.append((self.parse_primary(), self.prev.pos))
+
+            # lugar de operador
+            while True:
+                # los unarios pendientes se aplican al operando que acaba de cerrar
+                while ops and ops[-1][0] == "u":
+                    _, op, pos = ops.pop()
+                    node, last = operands.pop()
+                    operands.append((UnaryOp(op, node).at(pos, last), last))
+
+                kind, value = self.curr.kind, self.curr.value
+                if kind == "OP" and value in BINARY_PREC:
+                    prec = BINARY_PREC[value]
+                    while ops and ops[-1][0] == "b" and ops[-1][2] >= prec:
+                        reduce()
+                    ops.append(("b", value, prec))
+                    self._eat("OP")
+                    break
+
+                if kind == ")" and depth:
+                    while ops[-1][0] == "b":
+                        reduce()
+                    ops.pop()
+                    depth -= 1
+                    self._eat(")")
+                    node, _ = operands.pop()
+                    operands.append((node, self.prev.pos))
+                    continue
+
+                # fin de la expr
+                if depth:
+                    self._eat(")")   # falta un ')': truena con el msg de siempre
+                while ops:
+                    reduce()
+                return operands[0][0]
+
+    # primarios: numeros, bools y vars
     def parse_primary(self):
         # ints
         if self.curr.kind == "INT":
             value = int(self.curr.value)
             self._eat("INT")
-            return IntLiteral(value)
+            return IntLiteral(value).at(self.prev.pos, self.prev.pos)
 
         # true/false
         if self.curr.kind == "KW" and self.curr.value in ("true", "false"):
             val = (self.curr.value == "true")
             self._eat("KW")
-            return BoolLiteral(val)
+            return BoolLiteral(val).at(self.prev.pos, self.prev.pos)
 
         # var
         if self.curr.kind == "ID":
             name = self.curr.value
             self._eat("ID")
-            return VarRef(name)
-
-        # (expr)
-        if self.curr.kind == "(":
-            self._eat("(")
-            node = self.parse_expr()
-            self._eat(")")
-            return node
+            return VarRef(name).at(self.prev.pos, self.prev.pos)
 
+        # los '(' los maneja parse_expr
         raise SyntaxError(f"Unexpected token in expression: {self.curr.kind} {self.curr.value}")
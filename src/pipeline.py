@@ -0,0 +1,106 @@
+# pipeline.py
+# las etapas del compilador armadas en un solo lugar (lo usan los scripts):
+# programa completo -> lista de tac, o en streaming stmt por stmt
+
+from typing import Callable, Iterable, Iterator, List, Optional
+from src.lexer import stream_tokens
+from src.parser import Parser
+from src.semantics import SemanticAnalyzer
+from src.folding import ConstantFolder
+from src.codegen import TACGenerator
+from src.ast_nodes import Node, Span
+from src.tac import parse_program, format_program
+from src.optimizer import optimize
+from src.loops import optimize_loops
+from src.regalloc import reuse_temps as reuse_temps_instrs
+from src.srcmap import instr_spans
+from src.incremental import FragmentCache, compile_incremental
+
+# nivel maximo que se puede hacer en streaming (-O2 necesita todo el programa)
+STREAM_MAX_OPT = 1
+
+
+def compile_to_tac(source: str, opt_level: int = 0, reuse_temps: bool = False,
+                   report: Optional[Callable[[str], None]] = None,
+                   cache: Optional[FragmentCache] = None,
+                   source_map: Optional[List[Optional[Span]]] = None,
+                   unroll: int = 1, int_mode: str = "big") -> List[str]:
+    # report: si se da, recibe las estadisticas de cada etapa como texto
+    # cache: reusar el tac de los stmts que no cambiaron (ver incremental.py)
+    # source_map: si se da una lista, se llena con el rango del src de cada
+    # instruc del tac (ver srcmap.py)
+    # unroll: factor pa desenrollar loops contados con -O2 (1 = no)
+    # int_mode: "big", "wrap" o "trap"; las constantes se doblan igual que en
+    # el vm con ese modo (ver vm.int_ops)
+    # (SyntaxError / SemanticError se dejan pasar al que llama)
+    if cache is not None:
+        if source_map is not None:
+            raise ValueError("source maps are not available with the incremental cache")
+        tac = compile_incremental(source, cache, opt_level, int_mode)
+        origins: List[Optional[Node]] = [None] * len(tac)
+        if report:
+            report(f"cache: {cache.hits} stmts reusados, {cache.misses} compilados")
+    else:
+        parser = Parser(source)
+        program = parser.parse()
+        SemanticAnalyzer().analyze(program)
+
+        if opt_level >= 1:
+            folder = ConstantFolder(int_mode)
+            program = folder.optimize(program)
+            if report:
+                report(f"folding: {folder.folded} nodos simplificados")
+
+        gen = TACGenerator(short_circuit=opt_level >= 1, overflow=int_mode == "trap")
+        tac = gen.generate(program)
+        origins = gen.origins
+
+    if opt_level >= 2 or reuse_temps or report:
+        # los pases sobre el tac llevan el origen de cada instruc con ellas
+        instrs = parse_program(tac)
+        for ins, node in zip(instrs, origins):
+            ins.origin = node
+
+        if opt_level >= 2:
+            instrs, pass_stats = optimize(instrs, int_mode=int_mode)
+            if report:
+                report(str(pass_stats))
+            instrs, loop_stats = optimize_loops(instrs, unroll, int_mode)
+            if report:
+                report(str(loop_stats))
+            if loop_stats.hoisted or loop_stats.reduced or loop_stats.unrolled:
+                # limpiar lo que dejan (copias de la reduccion, cse entre copias)
+                instrs, _ = optimize(instrs, int_mode=int_mode)
+
+        # con report pero sin reuse solo se reporta
+        if reuse_temps or report:
+            reused, temp_report = reuse_temps_instrs(instrs)
+            if reuse_temps:
+                instrs = reused
+            if report:
+                report(str(temp_report))
+
+        tac = format_program(instrs)
+        origins = [ins.origin for ins in instrs]
+
+    if source_map is not None:
+        source_map[:] = instr_spans(tac, origins, parser.lexer.index)
+    return tac
+
+
+def compile_stream(lines: Iterable[str], opt_level: int = 0,
+                   int_mode: str = "big") -> Iterator[str]:
+    # cada stmt top-level pasa por lexer -> parser -> semantica -> codegen y sus
+    # lineas de tac salen de una vez; la memoria no depende del tamano del src
+    # (solo crecen la tabla de vars y los contadores de temps/labels)
+    if opt_level > STREAM_MAX_OPT:
+        raise ValueError(f"streaming supports up to -O{STREAM_MAX_OPT}")
+    parser = Parser.from_tokens(stream_tokens(lines))
+    sem = SemanticAnalyzer()
+    folder = ConstantFolder(int_mode) if opt_level >= 1 else None
+    gen = TACGenerator(short_circuit=opt_level >= 1, overflow=int_mode == "trap")
+    for stmt in parser.iter_statements():
+        sem.check_stmt(stmt)
+        stmts = folder.fold_stmt(stmt) if folder else [stmt]
+        for s in stmts:
+            yield from gen.generate_stmt(s)
@@ -0,0 +1,147 @@
+# profiler.py
+# profiler del vm: cuantas veces corre cada instruc y cuanto tiempo se lleva,
+# tambien por bloque basico/label. Es otra clase con su propio loop, asi
+# TACVM.run no paga nada cuando no se perfila
+
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.vm import TACVM, TACProgram, Op, UNSET
+
+
+@dataclass
+class Profile:
+    program: TACProgram
+    counts: List[int]     # instruc -> veces ejecutada
+    times: List[float]    # instruc -> segundos acumulados
+
+    def blocks(self) -> List[Tuple[str, int, int]]:
+        # (nombre, inicio, fin) de cada bloque basico: empieza en 0, en cada
+        # destino de salto y despues de cada salto
+        code = self.program.code
+        targets = self.program.target_labels()
+        leaders = {0} | set(targets)
+        for i, ins in enumerate(code):
+            if ins.op in (Op.GOTO, Op.IF, Op.IFOP):
+                leaders.add(i + 1)
+        starts = sorted(i for i in leaders if i < len(code))
+        out = []
+        for k, start in enumerate(starts):
+            end = starts[k + 1] if k + 1 < len(starts) else len(code)
+            name = targets.get(start, "entrada" if start == 0 else f"@{start}")
+            out.append((name, start, end))
+        return out
+
+    def block_stats(self) -> List[Tuple[str, int, int, int, float]]:
+        # (nombre, inicio, fin, veces que se entro, tiempo) por bloque
+        return [(name, start, end, self.counts[start], sum(self.times[start:end]))
+                for name, start, end in self.blocks()]
+
+    def line_stats(self, source_lines: Sequence[Optional[int]]) -> Dict[int, Tuple[int, float]]:
+        # linea del src -> (instrucs ejecutadas, tiempo)
+        out: Dict[int, Tuple[int, float]] = {}
+        for i, line in enumerate(source_lines):
+            if line is None or i >= len(self.counts):
+                continue
+            count, secs = out.get(line, (0, 0.0))
+            out[line] = (count + self.counts[i], secs + self.times[i])
+        return out
+
+    def report(self, top: int = 10, source_lines: Optional[Sequence[Optional[int]]] = None) -> str:
+        # source_lines: instruc -> linea del src (None si no tiene), opcional
+        total_count = sum(self.counts)
+        total_time = sum(self.times) or 1e-12
+        targets = self.program.target_labels()
+        lines = [f"instrucs ejecutadas: {total_count}, tiempo: {sum(self.times) * 1000:.2f} ms"]
+
+        def pct(secs: float) -> str:
+            return f"{secs / total_time:6.1%}"
+
+        lines.append("\nbloques mas calientes:")
+        blocks = sorted(self.block_stats(), key=lambda b: b[4], reverse=True)
+        for name, start, end, count, secs in blocks[:top]:
+            if count:
+                span = f"[{start}..{end - 1}]"
+                lines.append(f"  {name:10s} {span:14s} {count:10d} veces  "
+                             f"{secs * 1000:9.2f} ms {pct(secs)}")
+
+        lines.append("\ninstrucs mas calientes:")
+        hot = sorted(range(len(self.counts)), key=lambda i: self.times[i], reverse=True)
+        for i in hot[:top]:
+            if not self.counts[i]:
+                break
+            where = ""
+            if source_lines is not None and i < len(source_lines) and source_lines[i] is not None:
+                where = f"  (linea {source_lines[i]})"
+            lines.append(f"  {i:5d}  {self.counts[i]:10d}  {self.times[i] * 1000:9.2f} ms "
+                         f"{pct(self.times[i])}  {self.program.instr_text(i, targets)}{where}")
+
+        if source_lines is not None:
+            lines.append("\nlineas del src mas calientes:")
+            per_line = sorted(self.line_stats(source_lines).items(),
+                              key=lambda kv: kv[1][1], reverse=True)
+            for line, (count, secs) in per_line[:top]:
+                if count:
+                    lines.append(f"  linea {line:5d}  {count:10d}  {secs * 1000:9.2f} ms {pct(secs)}")
+        return "\n".join(lines)
+
+
+class ProfilingVM(TACVM):
+    # mismo vm pero run() cuenta y cronometra cada instruc; queda en self.profile.
+    # corre el code sin superinstrucciones pa que cada instruc del tac tenga su cuenta
+    def __init__(self, instructions, output=None, int_mode: str = "big"):
+        super().__init__(instructions, output, int_mode=int_mode)
+        n = len(self.program.code)
+        self.profile = Profile(self.program, [0] * n, [0.0] * n)
+
+    def run(self):
+        regs = self._int64_registers()
+        code = self.program.code_for(self.int_mode, False, isinstance(regs, array))
+        n = len(code)
+        counts, times = self.profile.counts, self.profile.times
+        clock = time.perf_counter
+        write = self.output.write
+        COPY, BINOP, IFOP, IF, GOTO = Op.COPY, Op.BINOP, Op.IFOP, Op.IF, Op.GOTO
+        pc = self.pc
+        # un solo clock() por instruc: lo que pasa entre dos lecturas se le
+        # cobra a la instruc que estaba corriendo
+        last = clock()
+        try:
+            while pc < n:
+                cur = pc
+                op, dst, a, fn, b, target, _ = code[pc]
+                pc += 1
+                if op == BINOP:
+                    regs[dst] = fn(regs[a], regs[b])
+                elif op == COPY:
+                    val = regs[a]
+                    if val is UNSET:
+                        raise TypeError("unset register")
+                    regs[dst] = val
+                elif op == IFOP:
+                    if fn(regs[a], regs[b]):
+                        pc = target
+                elif op == GOTO:
+                    pc = target
+                elif op == IF:
+                    if regs[a]:
+                        pc = target
+                else:
+                    val = regs[a] if fn is None else fn(regs[a], regs[b])
+                    if val is UNSET:
+                        raise TypeError("unset register")
+                    write(val)
+                now = clock()
+                counts[cur] += 1
+                times[cur] += now - last
+                last = now
+        except TypeError:
+            raise self._unset_error(pc - 1)
+        except ZeroDivisionError:
+            raise RuntimeError(f"Division by zero in: {self.program.instr_text(pc - 1)}")
+        except OverflowError:
+            raise RuntimeError(f"Integer overflow in: {self.program.instr_text(pc - 1)}")
+        finally:
+            self.pc = pc
+            self.output.flush()
@@ -0,0 +1,128 @@
+# pygen.py
+# backend alterno: traduce el tac a una sola funcion de python (vars como locales,
+# un bloque basico por rama) y la compila una vez con compile(); corre nativo sin
+# el loop de despacho del VM
+
+from typing import List, Dict, Union
+from src.tac import TacInstr, parse_program, is_const
+from src.optimizer import build_cfg
+from src.vm import TACProgram, _div
+from src.sinks import BufferedSink
+
+# ops del tac -> expr de python sobre ints (relacionales/logicos dan 0/1)
+PY_ARITH = {"+": "+", "-": "-", "*": "*"}
+PY_REL = {"<", "<=", ">", ">=", "==", "!="}
+PY_LOGIC = {"&&": "and", "||": "or"}
+
+# cuantos bloques de caida (fallthrough) se copian seguidos antes de despachar
+INLINE_FALLTHROUGH = 4
+
+
+def _operand(tok: str) -> str:
+    if is_const(tok):
+        return f"({tok})"
+    return f"v_{tok}"   # prefijo pa no chocar con keywords/builtins
+
+
+def _value(ins: TacInstr) -> str:
+    # expr de python que da el mismo int que el VM
+    a = _operand(ins.a)
+    if not ins.op:
+        return a
+    b = _operand(ins.b)
+    if ins.op in PY_ARITH:
+        return f"{a} {PY_ARITH[ins.op]} {b}"
+    if ins.op == "/":
+        return f"_div({a}, {b})"
+    if ins.op in PY_REL:
+        return f"(1 if {a} {ins.op} {b} else 0)"
+    return f"(1 if {a} {PY_LOGIC[ins.op]} {b} else 0)"
+
+
+def _cond(ins: TacInstr) -> str:
+    # en un if no hace falta materializar 0/1
+    a = _operand(ins.a)
+    if not ins.op:
+        return a
+    b = _operand(ins.b)
+    if ins.op in PY_REL:
+        return f"{a} {ins.op} {b}"
+    if ins.op in PY_LOGIC:
+        return f"{a} {PY_LOGIC[ins.op]} {b}"
+    return _value(ins)
+
+
+def translate(instrs: List[TacInstr]) -> str:
+    blocks = build_cfg(instrs) if instrs else []
+    where: Dict[str, int] = {}
+    for b in blocks:
+        for ins in b.instrs:
+            if ins.kind == "label":
+                where[ins.label] = b.index
+    n = len(blocks)
+
+    def goto(idx: int) -> List[str]:
+        # salir de la funcion si ya no hay bloque
+        return [f"_b = {idx}", "continue"] if idx < n else ["return"]
+
+    def block_body(b, inlined: int = 0) -> List[str]:
+        out: List[str] = []
+        ended = False
+        for ins in b.instrs:
+            if ins.kind == "label":
+                continue
+            if ins.kind in ("copy", "binop"):
+                out.append(f"v_{ins.dst} = {_value(ins)}")
+            elif ins.kind == "print":
+                out.append(f"_print({_value(ins)})")
+            elif ins.kind == "goto":
+                out += goto(where[ins.label])
+                ended = True
+            elif ins.kind == "if":
+                out.append(f"if {_cond(ins)}:")
+                out += ["    " + line for line in goto(where[ins.label])]
+        if not ended:
+            if b.index + 1 < n and inlined < INLINE_FALLTHROUGH:
+                # el bloque que sigue se copia aqui en vez de volver a despachar
+                out += block_body(blocks[b.index + 1], inlined + 1)
+            else:
+                out += goto(b.index + 1)
+        return out
+
+    def tree(lo: int, hi: int, indent: str) -> List[str]:
+        # arbol binario sobre el num de bloque: log2(n) comparaciones por salto
+        if hi - lo == 1:
+            return [indent + line for line in block_body(blocks[lo])]
+        mid = (lo + hi) // 2
+        return ([f"{indent}if _b < {mid}:"] + tree(lo, mid, indent + "    ")
+                + [f"{indent}else:"] + tree(mid, hi, indent + "    "))
+
+    lines = ["def program(_print, _div):"]
+    if n == 0:
+        lines.append("    return")
+    else:
+        lines += ["    _b = 0", "    while True:"] + tree(0, n, "        ")
+    return "\n".join(lines) + "\n"
+
+
+class PyVM:
+    # misma cara que TACVM: se arma con las lineas del tac y se llama run()
+    def __init__(self, instructions: Union[List[str], TACProgram], output=None):
+        if isinstance(instructions, TACProgram):
+            instructions = instructions.to_lines()
+        self.instructions = instructions
+        self.source = translate(parse_program(instructions))
+        namespace: Dict[str, object] = {}
+        exec(compile(self.source, "<tac>", "exec"), namespace)
+        self._program = namespace["program"]
+        self.output = output if output is not None else BufferedSink()
+
+    def run(self):
+        try:
+            self._program(self.output.write, _div)
+        except NameError as e:
+            raise RuntimeError(f"Variable used before assignment: {e}")
+        except ZeroDivisionError:
+            raise RuntimeError("Division by zero")
+        finally:
+            self.output.flush()
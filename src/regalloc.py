@@ -0,0 +1,113 @@
+# regalloc.py
+# reuso de temporales: TACGenerator.new_temp nunca recicla un tN, aqui se
+# calcula cuando muere cada temp (liveness) y se reasignan con linear scan
+
+import heapq
+from dataclasses import dataclass
+from typing import List, Dict, Set, Tuple
+from src.tac import TacInstr, parse_program, format_program, is_temp
+
+
+@dataclass
+class TempReport:
+    temps_before: int   # tNs distintos que salieron del codegen
+    temps_after: int    # tNs distintos despues de reusar
+    peak_live: int      # max de temps vivos al mismo tiempo
+
+    def __str__(self) -> str:
+        return (f"temporales: {self.temps_before} -> {self.temps_after} "
+                f"(pico de vivos: {self.peak_live})")
+
+
+def successors(instrs: List[TacInstr]) -> List[List[int]]:
+    # a donde puede seguir cada instruc (siguiente y/o destino del salto)
+    where = {ins.label: i for i, ins in enumerate(instrs) if ins.kind == "label"}
+    succ = []
+    n = len(instrs)
+    for i, ins in enumerate(instrs):
+        if ins.kind == "goto":
+            succ.append([where[ins.label]])
+        elif ins.kind == "if":
+            nxt = [where[ins.label]]
+            if i + 1 < n:
+                nxt.append(i + 1)
+            succ.append(nxt)
+        else:
+            succ.append([i + 1] if i + 1 < n else [])
+    return succ
+
+
+def temp_liveness(instrs: List[TacInstr]) -> List[Set[str]]:
+    # live-in de temps por instruc, iterando hacia atras hasta que no cambie
+    succ = successors(instrs)
+    uses = [[u for u in ins.uses() if is_temp(u)] for ins in instrs]
+    defs = [ins.dst if ins.dst and is_temp(ins.dst) else "" for ins in instrs]
+    live_in: List[Set[str]] = [set() for _ in instrs]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(instrs) - 1, -1, -1):
+            out: Set[str] = set()
+            for s in succ[i]:
+                out |= live_in[s]
+            out.discard(defs[i])
+            out.update(uses[i])
+            if out != live_in[i]:
+                live_in[i] = out
+                changed = True
+    return live_in
+
+
+def reuse_temps(instrs: List[TacInstr]) -> Tuple[List[TacInstr], TempReport]:
+    live_in = temp_liveness(instrs)
+
+    # intervalo [inicio, fin] de cada temp: cubre donde se define y donde esta vivo
+    start: Dict[str, int] = {}
+    end: Dict[str, int] = {}
+    defined_at: Dict[str, Set[int]] = {}
+    peak = 0
+    for i, ins in enumerate(instrs):
+        points = set(live_in[i])
+        if ins.dst and is_temp(ins.dst):
+            points.add(ins.dst)
+            defined_at.setdefault(ins.dst, set()).add(i)
+        peak = max(peak, len(points))
+        for t in points:
+            if t not in start:
+                start[t] = i
+            end[t] = i
+
+    # linear scan: un temp puede tomar el registro de otro que murio antes,
+    # o en la misma instruc si el viejo solo se lee ahi y el nuevo se escribe
+    order = sorted(start, key=lambda t: (start[t], end[t]))
+    active: List[Tuple[int, int]] = []   # heap de (fin, registro)
+    free: List[int] = []                 # heap de registros libres
+    assigned: Dict[str, int] = {}
+    count = 0
+    for t in order:
+        s = start[t]
+        writes_first = s in defined_at.get(t, ())
+        while active and (active[0][0] < s or (active[0][0] == s and writes_first)):
+            heapq.heappush(free, heapq.heappop(active)[1])
+        if free:
+            reg = heapq.heappop(free)
+        else:
+            count += 1
+            reg = count
+        assigned[t] = reg
+        heapq.heappush(active, (end[t], reg))
+
+    def rename(name: str) -> str:
+        return f"t{assigned[name]}" if name in assigned else name
+
+    out = []
+    for ins in instrs:
+        out.append(TacInstr(ins.kind, rename(ins.dst), rename(ins.a), ins.op,
+                            rename(ins.b), ins.label, ins.origin))
+    return out, TempReport(len(assigned), count, peak)
+
+
+def reuse_temps_text(lines: List[str]) -> Tuple[List[str], TempReport]:
+    # version sobre las lineas de texto que saca TACGenerator.generate
+    instrs, report = reuse_temps(parse_program(lines))
+    return format_program(instrs), report
@@ -1,7 +1,7 @@
 # semantics.py
 # checador semántico: aqui revisamos tipos vars declaradas
 
-from typing import Dict
+from typing import Dict, Set
 from src.ast_nodes import *
 
 class SemanticError(Exception):
@@ -10,6 +10,9 @@ class SemanticError(Exception):
 class SemanticAnalyzer:
     def __init__(self):
         self.env: Dict[str, str] = {}  # name -> 'int' or 'bool'
+        # vars que seguro ya tienen valor en este punto (asignacion definitiva):
+        # cada VarRef queda marcado con .assigned pa folding/codegen
+        self.assigned: Set[str] = set()
 
     def analyze(self, program: Program):
         for stmt in program.statements:
@@ -33,20 +36,28 @@ class SemanticAnalyzer:
                 raise SemanticError(
                     f"Type mismatch in assignment to '{stmt.name}': {t_var} = {t_expr}"
                 )
+            self.assigned.add(stmt.name)
 
         elif isinstance(stmt, IfStmt):
             t_cond = self.check_expr(stmt.cond)
             if t_cond != "bool":
                 raise SemanticError("Condition in if must be bool")
+            before = set(self.assigned)
             self.check_block(stmt.then_block)
+            after_then, self.assigned = self.assigned, before
             if stmt.else_block:
                 self.check_block(stmt.else_block)
+                # despues del if solo lo que asignan las dos ramas
+                self.assigned &= after_then
 
         elif isinstance(stmt, WhileStmt):
             t_cond = self.check_expr(stmt.cond)
             if t_cond != "bool":
                 raise SemanticError("Condition in while must be bool")
+            # el cuerpo puede no correr nunca: lo que asigna no cuenta despues
+            before = set(self.assigned)
             self.check_block(stmt.body)
+            self.assigned = before
 
         elif isinstance(stmt, PrintStmt):
             _ = self.check_expr(stmt.expr)
@@ -63,6 +74,33 @@ class SemanticAnalyzer:
             self.check_stmt(s)
 
     def check_expr(self, expr: Expr) -> str:
+        # postorden con pila explicita (sin recursion): una expr generada con
+        # miles de terminos no llega al limite de recursion. Los hijos se revisan
+        # izq a der antes que su nodo, igual que antes (mismos errores primero)
+        stack = [(expr, False)]
+        types = []   # tipos de los subarboles ya revisados
+        while stack:
+            node, children_done = stack.pop()
+            if isinstance(node, BinaryOp):
+                if not children_done:
+                    stack.append((node, True))
+                    stack.append((node.right, False))
+                    stack.append((node.left, False))
+                    continue
+                t_right = types.pop()
+                t_left = types.pop()
+                types.append(self._check_binary(node, t_left, t_right))
+            elif isinstance(node, UnaryOp):
+                if not children_done:
+                    stack.append((node, True))
+                    stack.append((node.expr, False))
+                    continue
+                types.append(self._check_unary(node, types.pop()))
+            else:
+                types.append(self._check_leaf(node))
+        return types.pop()
+
+    def _check_leaf(self, expr: Expr) -> str:
         if isinstance(expr, IntLiteral):
             expr.inferred_type = "int"
             return "int"
@@ -75,45 +113,43 @@ class SemanticAnalyzer:
             if expr.name not in self.env:
                 raise SemanticError(f"Undeclared variable '{expr.name}'")
             expr.inferred_type = self.env[expr.name]
+            expr.assigned = expr.name in self.assigned
             return expr.inferred_type
 
-        if isinstance(expr, UnaryOp):
-            t_sub = self.check_expr(expr.expr)
-            if expr.op == "-":
-                if t_sub != "int":
-                    raise SemanticError("Unary - expects int")
-                expr.inferred_type = "int"
-            elif expr.op == "!":
-                if t_sub != "bool":
-                    raise SemanticError("Unary ! expects bool")
-                expr.inferred_type = "bool"
-            else:
-                raise SemanticError(f"Unknown unary operator {expr.op}")
-            return expr.inferred_type
+        raise SemanticError(f"Unknown expression type: {type(expr)}")
 
-        if isinstance(expr, BinaryOp):
-            t_left = self.check_expr(expr.left)
-            t_right = self.check_expr(expr.right)
-            op = expr.op
+    def _check_unary(self, expr: UnaryOp, t_sub: str) -> str:
+        if expr.op == "-":
+            if t_sub != "int":
+                raise SemanticError("Unary - expects int")
+            expr.inferred_type = "int"
+        elif expr.op == "!":
+            if t_sub != "bool":
+                raise SemanticError("Unary ! expects bool")
+            expr.inferred_type = "bool"
+        else:
+            raise SemanticError(f"Unknown unary operator {expr.op}")
+        return expr.inferred_type
 
-            if op in ("+", "-", "*", "/"):
-                if t_left != "int" or t_right != "int":
-                    raise SemanticError("Arithmetic operators expect int operands")
-                expr.inferred_type = "int"
+    def _check_binary(self, expr: BinaryOp, t_left: str, t_right: str) -> str:
+        op = expr.op
 
-            elif op in ("<", "<=", ">", ">=", "==", "!="):
-                if t_left != t_right:
-                    raise SemanticError("Comparison operands must have same type")
-                expr.inferred_type = "bool"
+        if op in ("+", "-", "*", "/"):
+            if t_left != "int" or t_right != "int":
+                raise SemanticError("Arithmetic operators expect int operands")
+            expr.inferred_type = "int"
 
-            elif op in ("&&", "||"):
-                if t_left != "bool" or t_right != "bool":
-                    raise SemanticError("Logical operators expect bool operands")
-                expr.inferred_type = "bool"
+        elif op in ("<", "<=", ">", ">=", "==", "!="):
+            if t_left != t_right:
+                raise SemanticError("Comparison operands must have same type")
+            expr.inferred_type = "bool"
 
-            else:
-                raise SemanticError(f"Unknown binary operator {op}")
+        elif op in ("&&", "||"):
+            if t_left != "bool" or t_right != "bool":
+                raise SemanticError("Logical operators expect bool operands")
+            expr.inferred_type = "bool"
 
-            return expr.inferred_type
+        else:
+            raise SemanticError(f"Unknown binary operator {op}")
 
-        raise SemanticError(f"Unknown expression type: {type(expr)}")
+        return expr.inferred_type
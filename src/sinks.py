@@ -0,0 +1,47 @@
+# sinks.py
+# a donde van los print del programa. El vm llama sink.write(valor) por cada
+# print y sink.flush() al terminar (aun si truena)
+#   BufferedSink: el default, junta lineas y escribe de a bloques
+#   ListSink: guarda los valores en memoria (pa embeber o pa tests)
+
+import sys
+from typing import List, Optional, TextIO
+
+DEFAULT_LIMIT = 64 * 1024   # bytes juntados antes de escribir
+
+
+class BufferedSink:
+    # stream None = sys.stdout del momento del flush (asi redirect_stdout sigue jalando)
+    def __init__(self, stream: Optional[TextIO] = None, limit: int = DEFAULT_LIMIT):
+        self.stream = stream
+        self.limit = limit
+        self.parts: List[str] = []
+        self.size = 0
+
+    def write(self, value):
+        line = f"{value}\n"
+        self.parts.append(line)
+        self.size += len(line)
+        if self.size >= self.limit:
+            self.flush()
+
+    def flush(self):
+        stream = self.stream or sys.stdout
+        if self.parts:
+            stream.write("".join(self.parts))
+            self.parts.clear()
+            self.size = 0
+        stream.flush()
+
+
+class ListSink:
+    def __init__(self):
+        self.values: List[int] = []
+        self.write = self.values.append   # sin una llamada de mas por print
+
+    def flush(self):
+        pass
+
+    def text(self) -> str:
+        # lo mismo que se hubiera impreso
+        return "".join(f"{v}\n" for v in self.values)
@@ -0,0 +1,42 @@
+# srcmap.py
+# mapa tac -> src: una entrada por instruc (los labels no cuentan, igual que en
+# el vm decodificado) con el rango del src que la saco. Va en un archivo aparte
+# (out.tac.map, json) pa no tocar el tac ni el loop del vm
+
+import json
+from typing import Iterable, List, Optional
+from src.ast_nodes import Node, Span
+from src.lexer import LineIndex
+
+MAP_VERSION = 1
+
+
+def map_path(tac_path: str) -> str:
+    return tac_path + ".map"
+
+
+def instr_spans(tac: List[str], origins: Iterable[Optional[Node]],
+                index: LineIndex) -> List[Optional[Span]]:
+    # tac y origins van en paralelo (linea por linea); se saltan los labels
+    out: List[Optional[Span]] = []
+    for line, node in zip(tac, origins):
+        line = line.strip()
+        if not line or line.endswith(":"):
+            continue
+        out.append(node.span(index) if node is not None else None)
+    return out
+
+
+def dump_map(spans: List[Optional[Span]], path: str, source: str = ""):
+    data = {"version": MAP_VERSION, "source": source,
+            "instrs": [list(s) if s else None for s in spans]}
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def load_map(path: str) -> List[Optional[Span]]:
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != MAP_VERSION:
+        raise ValueError(f"Unsupported source map version in {path}")
+    return [Span(*s) if s else None for s in data["instrs"]]
@@ -0,0 +1,118 @@
+# tac.py
+# lineas tac ya partidas en campos; lo usan el VM al decodificar y los
+# pases que reescriben el tac (temps, optimizador) para no parsear cada uno a su modo
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, List
+
+INT_RE = re.compile(r"-?\d+$")
+NAME_RE = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*$")
+TEMP_RE = re.compile(r"t\d+$")   # temps que saca TACGenerator.new_temp
+
+BIN_OPS = ("+", "-", "*", "/", "<", "<=", ">", ">=", "==", "!=", "&&", "||")
+LOGIC_OPS = ("&&", "||")
+
+
+@dataclass
+class TacInstr:
+    kind: str        # 'label', 'copy', 'binop', 'print', 'goto', 'if'
+    dst: str = ""    # destino (copy/binop)
+    a: str = ""      # operandos como texto: var, temp o int
+    op: str = ""     # operador; vacio si la expr es un operando solo
+    b: str = ""
+    label: str = ""  # nombre del label (label) o a donde salta (goto/if)
+    # nodo del ast de donde salio (ver TACGenerator.origins); los pases que
+    # arman instrucs nuevas lo pasan al resultado pa no perder el mapa al src
+    origin: Any = field(default=None, compare=False, repr=False)
+
+    def uses(self) -> List[str]:
+        # vars/temps que lee la instruc (las constantes no cuentan)
+        out = []
+        if self.a and not INT_RE.match(self.a):
+            out.append(self.a)
+        if self.op and self.b and not INT_RE.match(self.b):
+            out.append(self.b)
+        return out
+
+    def expr_text(self) -> str:
+        if not self.op:
+            return self.a
+        if self.op in LOGIC_OPS:
+            # misma forma que saca el codegen pa && y ||
+            return f"({self.a} != 0) {self.op} ({self.b} != 0)"
+        return f"{self.a} {self.op} {self.b}"
+
+    def __str__(self) -> str:
+        if self.kind == "label":
+            return f"{self.label}:"
+        if self.kind == "goto":
+            return f"goto {self.label}"
+        if self.kind == "if":
+            return f"if {self.expr_text()} goto {self.label}"
+        if self.kind == "print":
+            return f"print {self.expr_text()}"
+        return f"{self.dst} := {self.expr_text()}"
+
+
+def is_const(operand: str) -> bool:
+    return bool(INT_RE.match(operand))
+
+
+def is_temp(name: str) -> bool:
+    return bool(TEMP_RE.match(name))
+
+
+def _operand(tok: str, line: str) -> str:
+    if INT_RE.match(tok) or NAME_RE.match(tok):
+        return tok
+    raise RuntimeError(f"Bad operand '{tok}' in: {line}")
+
+
+def parse_expr(expr: str, line: str):
+    # regresa (a, op, b); op es "" si la expr es un operando solo
+    tokens = expr.replace("(", " ( ").replace(")", " ) ").split()
+    if len(tokens) == 1:
+        return _operand(tokens[0], line), "", ""
+    if len(tokens) == 3 and tokens[1] in BIN_OPS:
+        return _operand(tokens[0], line), tokens[1], _operand(tokens[2], line)
+    # forma que saca el codegen pa && y ||: (a != 0) && (b != 0)
+    if (len(tokens) == 11 and tokens[0] == "(" and tokens[2] == "!=" and tokens[3] == "0"
+            and tokens[4] == ")" and tokens[5] in LOGIC_OPS and tokens[6] == "("
+            and tokens[8] == "!=" and tokens[9] == "0" and tokens[10] == ")"):
+        return _operand(tokens[1], line), tokens[5], _operand(tokens[7], line)
+    raise RuntimeError(f"Unsupported expression '{expr}' in: {line}")
+
+
+def parse_line(line: str) -> TacInstr:
+    line = line.strip()
+    if line.endswith(":"):
+        return TacInstr("label", label=line[:-1])
+    if line.startswith("print "):
+        a, op, b = parse_expr(line[len("print "):], line)
+        return TacInstr("print", a=a, op=op, b=b)
+    if line.startswith("goto "):
+        return TacInstr("goto", label=line[len("goto "):].strip())
+    if line.startswith("if "):
+        parts = line.split("goto")
+        if len(parts) != 2:
+            raise RuntimeError(f"Unknown instruction: {line}")
+        a, op, b = parse_expr(parts[0][len("if "):], line)
+        return TacInstr("if", a=a, op=op, b=b, label=parts[1].strip())
+    if ":=" in line:
+        left, right = line.split(":=")
+        dst = left.strip()
+        if not NAME_RE.match(dst):
+            raise RuntimeError(f"Bad destination '{dst}' in: {line}")
+        a, op, b = parse_expr(right, line)
+        return TacInstr("binop" if op else "copy", dst=dst, a=a, op=op, b=b)
+    raise RuntimeError(f"Unknown instruction: {line}")
+
+
+def parse_program(lines: List[str]) -> List[TacInstr]:
+    # lineas vacias no cuentan
+    return [parse_line(line) for line in lines if line.strip()]
+
+
+def format_program(instrs: List[TacInstr]) -> List[str]:
+    return [str(ins) for ins in instrs]
@@ -0,0 +1,107 @@
+# tacbin.py
+# formato binario del tac ya decodificado: header, pool de constantes, tabla de
+# simbolos e instrucs de ancho fijo con saltos resueltos. Se carga con mmap sin
+# parsear lineas, directo a un TACProgram listo pa el VM
+#
+# layout (little endian):
+#   header   MAGIC, version u16, nvars u32, nconsts u32, nlabels u32, ninstrs u32
+#   consts   nconsts x i64
+#   simbolos nvars x (u16 largo + utf8), nlabels x (u16 largo + utf8 + u32 indice)
+#   code     ninstrs x (u8 opcode, u8 operador, i32 dst, a, b, target)
+
+import mmap
+import struct
+from typing import List, Dict
+from src.vm import TACProgram, Instr, BINOPS, decode
+
+MAGIC = b"MLTC"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHIIII")
+CONST = struct.Struct("<q")
+NAME_LEN = struct.Struct("<H")
+LABEL_IDX = struct.Struct("<I")
+INSTR = struct.Struct("<BBiiii")
+
+# operador <-> codigo de 1 byte (0 = sin operador)
+OP_NAMES = list(BINOPS)
+OP_CODES = {BINOPS[sym]: i + 1 for i, sym in enumerate(OP_NAMES)}
+OP_FNS = [None] + [BINOPS[sym] for sym in OP_NAMES]
+
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def is_binary(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _name(s: str) -> bytes:
+    data = s.encode("utf-8")
+    return NAME_LEN.pack(len(data)) + data
+
+
+def dumps(program: TACProgram) -> bytes:
+    for c in program.consts:
+        if not INT64_MIN <= c <= INT64_MAX:
+            raise ValueError(f"Constant {c} does not fit in 64 bits")
+    parts = [HEADER.pack(MAGIC, VERSION, len(program.names), len(program.consts),
+                         len(program.labels), len(program.code))]
+    parts += [CONST.pack(c) for c in program.consts]
+    parts += [_name(n) for n in program.names]
+    for label, idx in program.labels.items():
+        parts.append(_name(label) + LABEL_IDX.pack(idx))
+    for ins in program.code:
+        opcode = OP_CODES[ins.fn] if ins.fn is not None else 0
+        parts.append(INSTR.pack(ins.op, opcode, ins.dst, ins.a, ins.b, ins.target))
+    return b"".join(parts)
+
+
+def dump_lines(lines: List[str], path: str):
+    # tac de texto -> archivo binario
+    with open(path, "wb") as f:
+        f.write(dumps(decode(lines)))
+
+
+def loads(buf) -> TACProgram:
+    # buf: bytes, memoryview o mmap
+    magic, version, nvars, nconsts, nlabels, ninstrs = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise RuntimeError("Not a binary TAC file")
+    if version != VERSION:
+        raise RuntimeError(f"Unsupported binary TAC version {version}")
+    pos = HEADER.size
+
+    consts = list(struct.unpack_from(f"<{nconsts}q", buf, pos))
+    pos += nconsts * CONST.size
+
+    def read_name():
+        nonlocal pos
+        (n,) = NAME_LEN.unpack_from(buf, pos)
+        pos += NAME_LEN.size
+        s = bytes(buf[pos:pos + n]).decode("utf-8")
+        pos += n
+        return s
+
+    names = [read_name() for _ in range(nvars)]
+    labels: Dict[str, int] = {}
+    for _ in range(nlabels):
+        label = read_name()
+        (labels[label],) = LABEL_IDX.unpack_from(buf, pos)
+        pos += LABEL_IDX.size
+
+    end = pos + ninstrs * INSTR.size
+    fns = OP_FNS
+    code = [Instr(op, dst, a, fns[opcode], b, target, "")
+            for op, opcode, dst, a, b, target in INSTR.iter_unpack(buf[pos:end])]
+    return TACProgram(code, labels, names, consts)
+
+
+def load(path: str) -> TACProgram:
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                return loads(view)
+            finally:
+                view.release()
@@ -1,76 +1,574 @@
 # vm.py
-from typing import List, Dict
+import operator
+from array import array
+from enum import IntEnum
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import List, Dict, NamedTuple, Optional, Callable, Tuple, Union
 from src.ast_nodes import *
+from src.tac import TacInstr, parse_line, is_const, is_temp
+from src.sinks import BufferedSink
 
-class TACVM:
-    def __init__(self, instructions: List[str]):
-        self.instructions = instructions
-        self.labels: Dict[str, int] = {}
-        self.vars: Dict[str, int] = {}
-        self.pc = 0  
-        self._index_labels()
-
-    def _index_labels(self):
-        idx = 0
-        new_instrs = []
-        for i, instr in enumerate(self.instructions):
-            line = instr.strip()
-            if line.endswith(":"):
-                label = line[:-1]
-                self.labels[label] = len(new_instrs)
+
+# opcodes de las instrucs ya decodificadas
+class Op(IntEnum):
+    COPY = 0     # x := a
+    BINOP = 1    # x := a op b
+    PRINT = 2    # print a  (o print a op b)
+    GOTO = 3     # goto L
+    IF = 4       # if a goto L
+    IFOP = 5     # if a op b goto L
+    # superinstrucciones (las arma fuse(), nunca salen en el tac): hacen en un
+    # solo despacho lo de varias instrucs seguidas y brincan a target
+    INC = 6      # x := x + b (t := x + b; x := t)
+    SET = 7      # x := a op b (t := a op b; x := t, y otras formas de pasar el valor)
+    NOT = 8      # x := !a (t := a != 0; x := 1 - t)
+    CMPJ = 9     # t := a op b; if t == 0 goto L  -> salta a target si da 0, si no sigue en dst
+
+
+class Instr(NamedTuple):
+    op: int                 # Op
+    dst: int                # slot destino (COPY/BINOP)
+    a: int                  # slot del primer operando
+    fn: Optional[Callable]  # funcion del operador sacada de BINOPS
+    b: int                  # slot del segundo operando
+    target: int             # indice de salto ya resuelto (GOTO/IF/IFOP), -1 si no aplica
+    text: str               # linea original pa mensajes de error
+
+
+def _div(a: int, b: int) -> int:
+    # division entera truncando hacia cero (como hacia int(a / b)) pero sin floats
+    q = a // b
+    if q < 0 and q * b != a:
+        q += 1
+    return q
+
+
+# tabla de operadores: op del tac -> funcion sobre ints ya resueltos
+# los relacionales/logicos regresan 0/1 igual que antes
+BINOPS: Dict[str, Callable[[int, int], int]] = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": _div,
+    "<": lambda a, b: 1 if a < b else 0,
+    "<=": lambda a, b: 1 if a <= b else 0,
+    ">": lambda a, b: 1 if a > b else 0,
+    ">=": lambda a, b: 1 if a >= b else 0,
+    "==": lambda a, b: 1 if a == b else 0,
+    "!=": lambda a, b: 1 if a != b else 0,
+    "&&": lambda a, b: 1 if a and b else 0,
+    "||": lambda a, b: 1 if a or b else 0,
+}
+
+
+# modos de enteros: "big" son los ints de python sin limite (el default);
+# "wrap" y "trap" son int64, al desbordarse dan la vuelta como en C o truenan.
+# El folding del compilador y el vm usan la misma tabla (int_ops) pa que un
+# programa de lo mismo doblado en compilacion que calculado en runtime
+INT_MODES = ("big", "wrap", "trap")
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+_BIAS, _MASK = 2 ** 63, 2 ** 64 - 1
+
+
+def wrap64(value: int) -> int:
+    return ((value + _BIAS) & _MASK) - _BIAS
+
+
+def check64(value: int) -> int:
+    if value < INT64_MIN or value > INT64_MAX:
+        raise OverflowError("int64 overflow")
+    return value
+
+
+def to_int_mode(value: int, int_mode: str) -> int:
+    # un valor ya calculado llevado al modo (trap: OverflowError si no cabe)
+    if int_mode == "wrap":
+        return wrap64(value)
+    if int_mode == "trap":
+        return check64(value)
+    return value
+
+
+@lru_cache(maxsize=None)
+def int_ops(int_mode: str) -> Dict[str, Callable[[int, int], int]]:
+    # tabla de operadores del modo: la de BINOPS con + - * / a 64 bits
+    # (los relacionales y logicos dan 0/1 y no cambian)
+    if int_mode == "big":
+        return BINOPS
+    if int_mode not in INT_MODES:
+        raise ValueError(f"Unknown int mode '{int_mode}'")
+    ops = dict(BINOPS)
+    if int_mode == "wrap":
+        ops["+"] = lambda a, b: ((a + b + _BIAS) & _MASK) - _BIAS
+        ops["-"] = lambda a, b: ((a - b + _BIAS) & _MASK) - _BIAS
+        ops["*"] = lambda a, b: ((a * b + _BIAS) & _MASK) - _BIAS
+        ops["/"] = lambda a, b: wrap64(_div(a, b))   # solo INT64_MIN / -1 se sale
+    else:
+        ops["+"] = lambda a, b: check64(a + b)
+        ops["-"] = lambda a, b: check64(a - b)
+        ops["*"] = lambda a, b: check64(a * b)
+        ops["/"] = lambda a, b: check64(_div(a, b))
+    return ops
+
+
+class _Unset:
+    # valor de los registros que nunca se asignaron; cualquier uso truena
+    # con TypeError y run() lo convierte en RuntimeError (sin checar en cada acceso)
+    def _fail(self, *args):
+        raise TypeError("unset register")
+
+    __bool__ = __eq__ = __ne__ = __lt__ = __le__ = __gt__ = __ge__ = _fail
+    __add__ = __radd__ = __sub__ = __rsub__ = __mul__ = __rmul__ = _fail
+    __floordiv__ = __rfloordiv__ = _fail
+    __hash__ = object.__hash__
+
+    def __repr__(self):
+        return "<unset>"
+
+
+UNSET = _Unset()
+
+# funcion del operador -> su simbolo en el tac (pa rearmar texto)
+OP_SYMBOLS = {fn: sym for sym, fn in BINOPS.items()}
+
+
+@dataclass(frozen=True)
+class TACProgram:
+    # inmutable: un mismo programa lo comparten todos los vm que lo corren
+    # (cada vm solo tiene sus registros y su pc); labels no se debe modificar
+    code: Tuple[Instr, ...]  # instrucs decodificadas
+    labels: Dict[str, int]   # label -> indice en code
+    names: Tuple[str, ...]   # slot -> nombre de var/temp
+    consts: Tuple[int, ...]  # constantes, van en los slots despues de las vars
+
+    def __post_init__(self):
+        # quien lo arme con listas igual recibe tuplas
+        for name in ("code", "names", "consts"):
+            object.__setattr__(self, name, tuple(getattr(self, name)))
+
+    @property
+    def nslots(self) -> int:
+        return len(self.names) + len(self.consts)
+
+    @cached_property
+    def slots(self) -> Dict[str, int]:
+        # nombre -> slot, se arma una vez por programa (no por vm)
+        return {name: i for i, name in enumerate(self.names)}
+
+    @cached_property
+    def _initial_registers(self) -> list:
+        return [UNSET] * len(self.names) + list(self.consts)
+
+    @cached_property
+    def fused(self) -> Tuple[Instr, ...]:
+        # el code con superinstrucciones, se arma una vez por programa
+        return fuse(self)
+
+    @cached_property
+    def _variants(self) -> dict:
+        # (modo de enteros, fused, array_regs) -> code con los operadores del modo
+        return {}
+
+    @cached_property
+    def _assigned_checks(self) -> dict:
+        # vars asignadas al entrar -> always_assigned
+        return {}
+
+    def code_for(self, int_mode: str = "big", fused: bool = True,
+                 array_regs: bool = False) -> Tuple[Instr, ...]:
+        # el code que corre el vm, con los operadores del modo de enteros. En
+        # int64 INC pasa a SET: su suma tambien tiene que dar la vuelta o tronar.
+        # Con "trap" y registros en array('q') guardar un valor que no cabe ya
+        # truena solo, asi que solo se checa lo que no se guarda (PRINT, IFOP, CMPJ)
+        code = self.fused if fused else self.code
+        if int_mode == "big":
+            return code
+        key = (int_mode, fused, array_regs)
+        if key not in self._variants:
+            ops = int_ops(int_mode)
+            store_traps = int_mode == "trap" and array_regs
+            out = []
+            for ins in code:
+                if store_traps and ins.op in (Op.BINOP, Op.SET, Op.INC):
+                    out.append(ins)
+                    continue
+                if ins.fn is not None:
+                    ins = ins._replace(fn=ops[OP_SYMBOLS[ins.fn]])
+                if ins.op == Op.INC:
+                    ins = ins._replace(op=Op.SET, fn=ops["+"])
+                out.append(ins)
+            self._variants[key] = tuple(out)
+        return self._variants[key]
+
+    def always_assigned(self, entry: frozenset) -> bool:
+        # True si ninguna instruc puede leer una var sin valor, empezando con las
+        # vars (slots) de entry ya asignadas. Asignacion definitiva por bloques
+        # con bitsets
+        if entry in self._assigned_checks:
+            return self._assigned_checks[entry]
+        code = self.code
+        n = len(code)
+        if not n:
+            return True
+        jumps = (Op.GOTO, Op.IF, Op.IFOP)
+        leaders = {0} | {ins.target for ins in code if ins.target >= 0}
+        leaders |= {i + 1 for i, ins in enumerate(code) if ins.op in jumps}
+        starts = sorted(i for i in leaders if i < n)
+        block_of = {start: k for k, start in enumerate(starts)}
+        ends = starts[1:] + [n]
+        preds: List[List[int]] = [[] for _ in starts]
+        for k, end in enumerate(ends):
+            last = code[end - 1]
+            succs = [] if last.op == Op.GOTO else [end]
+            if last.op in jumps:
+                succs.append(last.target)
+            for succ in succs:
+                if succ < n:
+                    preds[block_of[succ]].append(k)
+
+        def reads(ins: Instr) -> Tuple[int, ...]:
+            if ins.op == Op.GOTO:
+                return ()
+            return (ins.a, ins.b) if ins.fn is not None else (ins.a,)
+
+        nvars = len(self.names)
+        top = (1 << self.nslots) - 1
+        start_bits = sum(1 << slot for slot in entry) | (top ^ ((1 << nvars) - 1))
+        writes = []
+        for start, end in zip(starts, ends):
+            bits = 0
+            for ins in code[start:end]:
+                if ins.op in (Op.COPY, Op.BINOP):
+                    bits |= 1 << ins.dst
+            writes.append(bits)
+        # bloques sin preds (o inalcanzables) empiezan con todo asignado
+        ins_bits = [start_bits if k == 0 else top for k in range(len(starts))]
+        changed = True
+        while changed:
+            changed = False
+            for k in range(len(starts)):
+                bits = start_bits if k == 0 else top
+                for p in preds[k]:
+                    bits &= ins_bits[p] | writes[p]
+                if bits != ins_bits[k]:
+                    ins_bits[k] = bits
+                    changed = True
+        ok = True
+        for k, (start, end) in enumerate(zip(starts, ends)):
+            bits = ins_bits[k]
+            for ins in code[start:end]:
+                if any(not bits >> slot & 1 for slot in reads(ins)):
+                    ok = False
+                    break
+                if ins.op in (Op.COPY, Op.BINOP):
+                    bits |= 1 << ins.dst
+            if not ok:
+                break
+        self._assigned_checks[entry] = ok
+        return ok
+
+    def new_registers(self) -> list:
+        # archivo de registros: vars sin valor y luego las constantes ya cargadas
+        return self._initial_registers[:]
+
+    def operand_text(self, slot: int) -> str:
+        nvars = len(self.names)
+        return self.names[slot] if slot < nvars else str(self.consts[slot - nvars])
+
+    def target_labels(self) -> Dict[int, str]:
+        # indice -> nombre de label; los saltos sin label conocido se llaman L<indice>
+        out = {idx: name for name, idx in self.labels.items()}
+        for ins in self.code:
+            if ins.target >= 0 and ins.target not in out:
+                out[ins.target] = f"L{ins.target}"
+        return out
+
+    def instr_text(self, i: int, targets: Optional[Dict[int, str]] = None) -> str:
+        # texto de la instruc i; si vino del formato binario se rearma con los slots
+        ins = self.code[i]
+        if ins.text:
+            return ins.text
+        if targets is None:
+            targets = self.target_labels()
+        expr = self.operand_text(ins.a)
+        if ins.fn is not None:
+            tac = TacInstr("copy", a=expr, op=OP_SYMBOLS[ins.fn], b=self.operand_text(ins.b))
+            expr = tac.expr_text()
+        if ins.op == Op.PRINT:
+            return f"print {expr}"
+        if ins.op == Op.GOTO:
+            return f"goto {targets[ins.target]}"
+        if ins.op in (Op.IF, Op.IFOP):
+            return f"if {expr} goto {targets[ins.target]}"
+        return f"{self.names[ins.dst]} := {expr}"
+
+    def to_lines(self) -> List[str]:
+        # el programa otra vez como lineas de tac (labels incluidos)
+        targets = self.target_labels()
+        lines: List[str] = []
+        for i in range(len(self.code) + 1):
+            if i in targets:
+                lines.append(f"{targets[i]}:")
+            if i < len(self.code):
+                lines.append(self.instr_text(i, targets))
+        return lines
+
+
+def decode(instructions: List[str]) -> TACProgram:
+    # pasada 1: parsear cada linea una sola vez y ver a donde apunta cada label
+    labels: Dict[str, int] = {}
+    parsed = []
+    for instr in instructions:
+        line = instr.strip()
+        if not line:
+            continue
+        ins = parse_line(line)
+        if ins.kind == "label":
+            labels[ins.label] = len(parsed)
+        else:
+            parsed.append((ins, line))
+
+    def resolve(label: str) -> int:
+        if label not in labels:
+            raise RuntimeError(f"Unknown label: {label}")
+        return labels[label]
+
+    # cada var/temp y cada constante distinta recibe un slot denso
+    var_slots: Dict[str, int] = {}
+    const_slots: Dict[int, int] = {}
+
+    def slot(tok: str) -> int:
+        if not tok:
+            return 0
+        if is_const(tok):
+            value = int(tok)
+            if value not in const_slots:
+                const_slots[value] = len(const_slots)
+            return -1 - const_slots[value]   # se reubica al final
+        if tok not in var_slots:
+            var_slots[tok] = len(var_slots)
+        return var_slots[tok]
+
+    # pasada 2: armar las instrucs con slots y saltos ya resueltos
+    code: List[Instr] = []
+    for ins, line in parsed:
+        fn = BINOPS[ins.op] if ins.op else None
+        if ins.kind == "print":
+            code.append(Instr(Op.PRINT, 0, slot(ins.a), fn, slot(ins.b), -1, line))
+        elif ins.kind == "goto":
+            code.append(Instr(Op.GOTO, 0, 0, None, 0, resolve(ins.label), line))
+        elif ins.kind == "if":
+            op = Op.IF if fn is None else Op.IFOP
+            code.append(Instr(op, 0, slot(ins.a), fn, slot(ins.b), resolve(ins.label), line))
+        else:
+            op = Op.COPY if fn is None else Op.BINOP
+            a, b = slot(ins.a), slot(ins.b)
+            code.append(Instr(op, slot(ins.dst), a, fn, b, -1, line))
+
+    # ya sabemos cuantas vars hay: las constantes (slots negativos) van despues
+    nvars = len(var_slots)
+
+    def fix(slot: int) -> int:
+        return nvars - 1 - slot if slot < 0 else slot
+
+    code = [ins._replace(a=fix(ins.a), b=fix(ins.b)) for ins in code]
+    return TACProgram(tuple(code), labels, tuple(var_slots), tuple(const_slots))
+
+
+# peephole sobre el programa decodificado: junta secuencias tipicas del codegen
+# en una superinstruc que va en el lugar de la primera y brinca las demas. El
+# code fusionado mide lo mismo que el original (los indices de saltos, mapas y
+# errores no cambian); las instrucs brincadas se quedan ahi sin correr. Solo se
+# funde si lo de en medio no es destino de un salto y si el temp intermedio no
+# se lee en ningun otro lado (con --reuse-temps un temp se puede leer varias veces)
+
+def fuse(program: TACProgram) -> Tuple[Instr, ...]:
+    code = program.code
+    n = len(code)
+    nvars = len(program.names)
+    targets = {ins.target for ins in code if ins.target >= 0}
+    reads = [0] * program.nslots
+    for ins in code:
+        if ins.op in (Op.COPY, Op.BINOP, Op.PRINT, Op.IF, Op.IFOP):
+            reads[ins.a] += 1
+        if ins.fn is not None:
+            reads[ins.b] += 1
+    add, sub, ne, eq = BINOPS["+"], BINOPS["-"], BINOPS["!="], BINOPS["=="]
+    # ops que ya dan 0/1, y su negado
+    boolean = {BINOPS[sym] for sym in ("<", "<=", ">", ">=", "==", "!=", "&&", "||")}
+    negated = {BINOPS[x]: BINOPS[y] for x, y in
+               (("<", ">="), (">=", "<"), (">", "<="), ("<=", ">"), ("==", "!="), ("!=", "=="))}
+
+    def const(slot: int, value: int) -> bool:
+        return slot >= nvars and program.consts[slot - nvars] == value
+
+    def dead_temp(slot: int) -> bool:
+        # temp que solo lee la instruc que se esta fundiendo
+        return slot < nvars and reads[slot] == 1 and is_temp(program.names[slot])
+
+    def combine(cur: Instr, nxt: Instr) -> Optional[Instr]:
+        # cur (BINOP o NOT) deja su valor en el temp t y nxt lo consume
+        if cur.op not in (Op.BINOP, Op.NOT) or not dead_temp(cur.dst):
+            return None
+        t = cur.dst
+        if nxt.op == Op.COPY and nxt.a == t:
+            # t := ...; x := t  ->  x := ...
+            return cur._replace(dst=nxt.dst)
+        if nxt.op == Op.BINOP and nxt.fn is ne and nxt.a == t and const(nxt.b, 0):
+            # u := t != 0 no cambia un 0/1
+            if cur.op == Op.NOT or cur.fn in boolean:
+                return cur._replace(dst=nxt.dst)
+        if nxt.op == Op.BINOP and nxt.fn is sub and nxt.b == t and const(nxt.a, 1):
+            # la expansion de !: t := a != 0; u := 1 - t  ->  u := !a
+            if cur.op == Op.BINOP and cur.fn is ne and const(cur.b, 0):
+                return cur._replace(op=Op.NOT, dst=nxt.dst, fn=None, b=0)
+            if cur.op == Op.BINOP and cur.fn in negated:
+                return cur._replace(dst=nxt.dst, fn=negated[cur.fn])
+        if nxt.op == Op.IFOP and nxt.fn is eq and nxt.a == t and const(nxt.b, 0):
+            # t := a op b; if t == 0 goto L. Con !a salta si a != 0 (a == 0 da 0)
+            if cur.op == Op.NOT:
+                return cur._replace(op=Op.CMPJ, fn=eq, b=nxt.b, target=nxt.target)
+            return cur._replace(op=Op.CMPJ, target=nxt.target)
+        return None
+
+    out = list(code)
+    i = 0
+    while i < n:
+        cur, end = code[i], i + 1
+        while end < n and end not in targets and cur.op != Op.CMPJ:
+            merged = combine(cur, code[end])
+            if merged is None:
+                break
+            cur, end = merged, end + 1
+        if cur.op == Op.BINOP and cur.fn is add and cur.dst == cur.a:
+            cur = cur._replace(op=Op.INC)   # tambien x := x + b suelto (como sale en -O2)
+        elif cur.op == Op.BINOP and end > i + 1:
+            cur = cur._replace(op=Op.SET)
+        if cur is not code[i]:
+            # la superinstruc sigue en end; CMPJ usa target pa su salto
+            if cur.op == Op.CMPJ:
+                cur = cur._replace(dst=end)
             else:
-                new_instrs.append(instr)
-        self.instructions = new_instrs
+                cur = cur._replace(target=end)
+            out[i] = cur
+        i = end
+    return tuple(out)
+
+
+class TACVM:
+    def __init__(self, instructions: Union[List[str], TACProgram], output=None,
+                 fused: bool = True, int_mode: str = "big"):
+        # se puede armar con lineas de tac o con un programa ya decodificado
+        # (ej. el que carga tacbin.load); output: sink de los print (ver sinks.py)
+        # fused: correr con superinstrucciones (ver fuse)
+        # int_mode: "big", "wrap" o "trap" (ver int_ops)
+        if int_mode not in INT_MODES:
+            raise ValueError(f"Unknown int mode '{int_mode}'")
+        if isinstance(instructions, TACProgram):
+            self.program = instructions
+        else:
+            self.program = decode(instructions)
+        # lo unico por vm: registros, pc y salida
+        self.labels = self.program.labels
+        self.slots = self.program.slots
+        self.regs = self.program.new_registers()
+        self.pc = 0
+        self.output = output if output is not None else BufferedSink()
+        self.fused = fused
+        self.int_mode = int_mode
+
+    @property
+    def instructions(self) -> List[str]:
+        # el tac como texto, solo pa debug (del binario se rearma)
+        return self.program.to_lines()
+
+    @property
+    def vars(self) -> Dict[str, int]:
+        # vista por nombre del archivo de registros, solo pa debug
+        regs = self.regs
+        return {name: regs[i] for i, name in enumerate(self.program.names) if regs[i] is not UNSET}
+
+    def _int64_registers(self):
+        # en int64 los valores iniciales (vars dadas y constantes) se llevan al
+        # modo, y si ninguna lectura puede ver una var sin valor los registros
+        # van en un array('q'): 8 bytes por registro y sin bignums. Si no, se
+        # quedan en la lista con UNSET (los operadores ya son de 64 bits)
+        regs = self.regs
+        if self.int_mode == "big" or isinstance(regs, array):
+            return regs
+        for slot, value in enumerate(regs):
+            if value is not UNSET:
+                try:
+                    regs[slot] = to_int_mode(value, self.int_mode)
+                except OverflowError:
+                    raise RuntimeError(f"Integer overflow in value of: {self.program.operand_text(slot)}")
+        entry = frozenset(i for i in range(len(self.program.names)) if regs[i] is not UNSET)
+        if self.program.always_assigned(entry):
+            self.regs = array("q", [0 if value is UNSET else value for value in regs])
+        return self.regs
 
     def run(self):
-        while self.pc < len(self.instructions):
-            instr = self.instructions[self.pc].strip()
-            self.pc += 1
-            if not instr:
-                continue
-            if instr.startswith("print "):
-                expr = instr[len("print "):].strip()
-                val = self.eval_expr(expr)
-                print(val)
-                continue
-            if instr.startswith("goto "):
-                label = instr[len("goto "):].strip()
-                self.pc = self.labels[label]
-                continue
-            if instr.startswith("if "):
-                parts = instr.split("goto")
-                cond_part = parts[0][len("if "):].strip()
-                label = parts[1].strip()
-                cond_val = self.eval_expr(cond_part)
-                if cond_val:
-                    self.pc = self.labels[label]
-                continue
-            if ":=" in instr:
-                left, right = instr.split(":=")
-                left = left.strip()
-                right = right.strip()
-                val = self.eval_expr(right)
-                self.vars[left] = val
-                continue
-            raise RuntimeError(f"Unknown instruction: {instr}")
-
-    def eval_expr(self, expr: str) -> int:
-        
-        tokens = expr.replace("(", " ( ").replace(")", " ) ").split()
-        out_tokens = []
-        for t in tokens:
-            if t in self.vars:
-                out_tokens.append(str(self.vars[t]))
-            else:
-                out_tokens.append(t)
-        safe_expr = " ".join(out_tokens)
-        safe_expr = safe_expr.replace("&&", " and ")
-        safe_expr = safe_expr.replace("||", " or ")
-        
+        # locales pa no buscar atributos en cada paso
+        regs = self._int64_registers()
+        code = self.program.code_for(self.int_mode, self.fused, isinstance(regs, array))
+        n = len(code)
+        COPY, BINOP, IFOP, IF, GOTO = Op.COPY, Op.BINOP, Op.IFOP, Op.IF, Op.GOTO
+        INC, SET, NOT, CMPJ = Op.INC, Op.SET, Op.NOT, Op.CMPJ
+        write = self.output.write
+        pc = self.pc
         try:
-            val = eval(safe_expr, {"__builtins__": {}}, {})
-        except Exception as e:
-            raise RuntimeError(f"Error evaluating expression '{expr}' as '{safe_expr}': {e}")
-        if isinstance(val, bool):
-            return 1 if val else 0
-        return int(val)
+            while pc < n:
+                op, dst, a, fn, b, target, _ = code[pc]
+                pc += 1
+                # si una superinstruc truena, pc - 1 sigue siendo su primera instruc
+                if op == BINOP:
+                    regs[dst] = fn(regs[a], regs[b])
+                elif op == CMPJ:
+                    pc = dst if fn(regs[a], regs[b]) else target
+                elif op == INC:
+                    regs[dst] = regs[a] + regs[b]
+                    pc = target
+                elif op == IFOP:
+                    if fn(regs[a], regs[b]):
+                        pc = target
+                elif op == COPY:
+                    val = regs[a]
+                    if val is UNSET:   # copiar una var sin valor tambien truena
+                        raise TypeError("unset register")
+                    regs[dst] = val
+                elif op == SET:
+                    regs[dst] = fn(regs[a], regs[b])
+                    pc = target
+                elif op == NOT:
+                    regs[dst] = 0 if regs[a] else 1
+                    pc = target
+                elif op == GOTO:
+                    pc = target
+                elif op == IF:
+                    if regs[a]:
+                        pc = target
+                else:
+                    val = regs[a] if fn is None else fn(regs[a], regs[b])
+                    if val is UNSET:
+                        raise TypeError("unset register")
+                    write(val)
+        except TypeError:
+            raise self._unset_error(pc - 1)
+        except ZeroDivisionError:
+            raise RuntimeError(f"Division by zero in: {self.program.instr_text(pc - 1)}")
+        except OverflowError:
+            raise RuntimeError(f"Integer overflow in: {self.program.instr_text(pc - 1)}")
+        finally:
+            self.pc = pc
+            self.output.flush()   # lo que se imprimio antes de un error tambien sale
+
+    def _unset_error(self, i: int) -> RuntimeError:
+        # el error dice que var no tenia valor: la primera que lee la instruc i
+        # (en una superinstruc los operandos son los de su primera instruc)
+        ins = self.program.code[i]
+        text = self.program.instr_text(i)
+        for slot in ((ins.a, ins.b) if ins.fn is not None else (ins.a,)):
+            if self.regs[slot] is UNSET:
+                return RuntimeError(f"Variable '{self.program.names[slot]}' used before assignment in: {text}")
+        return RuntimeError(f"Variable used before assignment in: {text}")